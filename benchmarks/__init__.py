@@ -0,0 +1,6 @@
+"""
+Package benchmarks
+------------------
+Suite de benchmarks reproductibles (étapes pipeline + endpoints API).
+Usage : python -m benchmarks.run --scales 1,10,100
+"""
@@ -0,0 +1,134 @@
+"""API load benchmarks
+======================
+Start the FastAPI app on a local port and fire concurrent requests at
+`/predict` and `/forecast`, reporting throughput and p50/p99 latency.
+
+Each endpoint is measured with the result cache disabled (every request is
+computed) and enabled (identical payloads, as dashboards send them). A long
+forecast (`forecast_horizon` 15-minute points) is also requested in plain and
+columnar JSON to compare serialization on the wire.
+"""
+from __future__ import annotations
+
+import http.client
+import json
+import logging
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import uvicorn
+
+from benchmarks.harness import percentiles
+from benchmarks.synthetic import make_series
+
+logger = logging.getLogger("bench_api")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalServer:
+    """Run uvicorn in a background thread for the duration of a `with` block."""
+
+    def __init__(self, app, port: int | None = None):
+        self.port = port or _free_port()
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        deadline = time.time() + 30
+        while not self.server.started:
+            if time.time() > deadline:
+                raise RuntimeError("API server did not start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def multipart(filename: str, content: bytes, content_type: str = "text/csv") -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def load_test(port: int, path: str, body: bytes, content_type: str, n_requests: int = 200,
+              concurrency: int = 8, headers: Dict[str, str] | None = None) -> Dict[str, Any]:
+    local = threading.local()
+    hdrs = {"Content-Type": content_type, **(headers or {})}
+
+    def one(_):
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = local.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        t0 = time.perf_counter()
+        conn.request("POST", path, body=body, headers=hdrs)
+        resp = conn.getresponse()
+        payload = resp.read()
+        return (time.perf_counter() - t0) * 1000.0, resp.status, len(payload)
+
+    t_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(n_requests)))
+    elapsed = time.perf_counter() - t_start
+    latencies: List[float] = [s[0] for s in samples]
+    errors = sum(1 for s in samples if s[1] >= 400)
+    return {
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": n_requests / elapsed if elapsed else 0.0,
+        "response_bytes": float(samples[-1][2]) if samples else 0.0,
+        **percentiles(latencies),
+    }
+
+
+def run_api_benchmarks(n_requests: int = 200, concurrency: int = 8, history: int = 96,
+                       series_points: int = 2880, predict_model: str = "persistence",
+                       forecast_horizon: int = 2880) -> Dict[str, Any]:
+    from src.api import serve_api
+    from src.api.serialization import COLUMNAR
+
+    series = make_series(series_points)
+    csv_body = series.assign(timestamp=series["timestamp"].map(lambda t: t.isoformat())) \
+                     .to_csv(index=False).encode()
+    forecast_body, forecast_ct = multipart("bench.csv", csv_body)
+    predict_body = json.dumps({"recent_history": series["value"].tail(history).tolist(),
+                               "model": predict_model}).encode()
+
+    results: Dict[str, Any] = {}
+    previous = serve_api.CACHE_ENABLED
+    try:
+        with LocalServer(serve_api.app) as srv:
+            for cached in (False, True):
+                serve_api.CACHE_ENABLED = cached
+                serve_api.result_cache.clear()
+                suffix = "_cached" if cached else ""
+                logger.info("Load testing /predict and /forecast (cache=%s)", cached)
+                results[f"predict{suffix}"] = load_test(srv.port, "/predict", predict_body, "application/json",
+                                                        n_requests, concurrency)
+                results[f"forecast{suffix}"] = load_test(srv.port, "/forecast", forecast_body, forecast_ct,
+                                                         n_requests, concurrency)
+            serve_api.CACHE_ENABLED = False
+            long_path = f"/forecast?horizon={forecast_horizon}&freq=15min"
+            for name, accept in (("forecast_long_json", "application/json"), ("forecast_long_columnar", COLUMNAR)):
+                results[name] = load_test(srv.port, long_path, forecast_body, forecast_ct, n_requests,
+                                          concurrency, headers={"Accept": accept})
+    finally:
+        serve_api.CACHE_ENABLED = previous
+    return results
@@ -0,0 +1,101 @@
+"""Pipeline stage benchmarks
+============================
+Wall time and peak memory of each pipeline stage on synthetic meter data at
+several multiples of the real raw data size.
+
+Stages: read_and_concat, resample_and_clean, create_time_features,
+create_lags_rolls, create_sequences, and optional model fits
+(lightgbm, sarimax, lstm).
+"""
+from __future__ import annotations
+
+import logging
+import tempfile
+from typing import Any, Dict, Iterable
+
+import numpy as np
+import yaml
+
+from benchmarks.harness import measure
+from benchmarks.synthetic import make_meter_data, raw_size
+from src.data.data_load import read_and_concat, resample_and_clean
+from src.data.feature_engineering import create_lags_rolls, create_time_features
+
+logger = logging.getLogger("bench_pipeline")
+
+LOOKBACK = 96
+
+
+def load_configs():
+    with open("configs/params.yaml") as f:
+        cfg = yaml.safe_load(f)
+    with open("configs/experiments.yaml") as f:
+        exp = yaml.safe_load(f)
+    return cfg, exp
+
+
+def _first_params(conf: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v[0] if isinstance(v, list) else v for k, v in conf.items()}
+
+
+def bench_scale(scale: int, cfg: Dict[str, Any], exp: Dict[str, Any], models: Iterable[str] = (),
+                repeat: int = 3) -> Dict[str, Any]:
+    d = cfg["data"]
+    target_col = cfg["training"]["target_col"]
+    out: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as raw_dir:
+        make_meter_data(raw_dir, scale=scale, base_rows=raw_size(cfg["paths"]["raw_dir"]))
+        df, out["read_and_concat"] = measure(
+            read_and_concat, raw_dir, date_col=d["datetime_cols"]["date_col"],
+            time_col=d["datetime_cols"]["time_col"], consumption_col=d["consumption_col"],
+            dayfirst=d.get("dayfirst", True), repeat=repeat)
+    out["read_and_concat"]["rows"] = len(df)
+    res, out["resample_and_clean"] = measure(
+        resample_and_clean, df, d["resample_freq"], d["fillna_method"], d["threshold_on"], repeat=repeat)
+    out["resample_and_clean"]["rows"] = len(res)
+    feats, out["create_time_features"] = measure(create_time_features, res, repeat=repeat)
+    feats, out["create_lags_rolls"] = measure(create_lags_rolls, feats, repeat=repeat)
+    feats = feats.dropna()
+    X = feats.drop(columns=[target_col])
+    y = feats[target_col]
+
+    from src.models.architecture import create_sequences
+    _, out["create_sequences"] = measure(create_sequences, X.values, y.values, lookback=LOOKBACK,
+                                         repeat=repeat)
+
+    models = set(models)
+    if "lightgbm" in models:
+        import lightgbm as lgb
+        param = _first_params(exp["models"]["lightgbm"]["params"])
+        param["verbosity"] = -1
+
+        def fit_lgb():
+            return lgb.train(param, lgb.Dataset(X, label=y),
+                             num_boost_round=param.get("n_estimators", 100))
+        _, out["fit_lightgbm"] = measure(fit_lgb, repeat=1)
+    if "sarimax" in models:
+        from src.models.architecture import train_sarimax
+        _, out["fit_sarimax"] = measure(train_sarimax, y, None, exp["models"]["sarimax"], repeat=1)
+    if "lstm" in models:
+        from src.models.architecture import create_lstm_model
+        params = _first_params(exp["models"]["lstm"]["params"])
+        Xs, ys = create_sequences(X.values, y.values, lookback=LOOKBACK)
+
+        def fit_lstm():
+            model = create_lstm_model(input_shape=(Xs.shape[1], Xs.shape[2]),
+                                      units=int(params.get("units", 64)), lr=float(params.get("lr", 0.001)))
+            # one epoch is enough to compare per-epoch cost between runs
+            model.fit(Xs, ys, epochs=1, batch_size=int(params.get("batch_size", 64)), verbose=0)
+        _, out["fit_lstm_1epoch"] = measure(fit_lstm, repeat=1)
+    return out
+
+
+def run_pipeline_benchmarks(scales: Iterable[int] = (1, 10, 100), models: Iterable[str] = (),
+                            repeat: int = 3) -> Dict[str, Any]:
+    cfg, exp = load_configs()
+    np.random.seed(cfg.get("seed", 42))
+    results = {}
+    for scale in scales:
+        logger.info("Pipeline benchmark at %sx", scale)
+        results[f"{scale}x"] = bench_scale(scale, cfg, exp, models=models, repeat=repeat)
+    return results
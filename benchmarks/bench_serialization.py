@@ -0,0 +1,57 @@
+"""Serialization benchmarks
+===========================
+Encoding cost and bytes-on-wire of a `/forecast` response for growing horizons:
+
+- legacy: list of {"timestamp": ts.isoformat(), "value"} dicts through FastAPI's
+  generic `jsonable_encoder` + `json.dumps` (the pre-negotiation path)
+- json: negotiated default (columnar payload expanded, orjson when installed)
+- columnar: application/vnd.greenpulse.columnar+json
+- msgpack: application/x-msgpack (skipped when msgpack is not installed)
+"""
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, Dict, Iterable
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.harness import measure
+from src.api.serialization import (COLUMNAR, JSON, MSGPACK, available_formats,
+                                   columnar_series, render)
+
+logger = logging.getLogger("bench_serialization")
+
+
+def _payload(horizon: int, freq: str = "15min") -> Dict[str, Any]:
+    start = pd.Timestamp("2022-03-01T00:00:00Z")
+    values = np.random.default_rng(0).random(horizon) * 5
+    return {"label": "Prévision énergétique", "model": "naive-persistence",
+            "forecast": columnar_series(start, freq, values), "metrics": {"mae": 0.1, "rmse": 0.2}}
+
+
+def _legacy(payload: Dict[str, Any]) -> bytes:
+    col = payload["forecast"]
+    idx = pd.date_range(pd.Timestamp(col["start"]), periods=col["periods"], freq=col["freq"])
+    points = [{"timestamp": ts.isoformat(), "value": float(v)} for ts, v in zip(idx, col["values"])]
+    return json.dumps(jsonable_encoder({**payload, "forecast": points})).encode()
+
+
+def run_serialization_benchmarks(horizons: Iterable[int] = (96, 2880, 28800), repeat: int = 5) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for h in horizons:
+        payload = _payload(h)
+        row: Dict[str, Any] = {}
+        body, row["legacy"] = measure(_legacy, payload, repeat=repeat)
+        row["legacy"]["response_bytes"] = float(len(body))
+        for name, fmt in (("json", JSON), ("columnar", COLUMNAR), ("msgpack", MSGPACK)):
+            if fmt not in available_formats():
+                continue
+            resp, row[name] = measure(render, payload, fmt, repeat=repeat)
+            row[name]["response_bytes"] = float(len(resp.body))
+        results[f"horizon_{h}"] = row
+        logger.info("Serialization h=%s: %s", h,
+                    {k: round(v["wall_s_best"] * 1000, 2) for k, v in row.items()})
+    return results
@@ -0,0 +1,118 @@
+"""Worker scaling benchmarks
+============================
+Start `python -m src.api.server --workers N` for increasing N and report, per
+worker count, the RSS and PSS (proportional set size, which splits pages shared
+copy-on-write between processes) of each worker, plus `/predict` throughput
+and latency.
+
+A LightGBM model on the lag features used by `/predict` is trained into a
+temporary models dir so every request goes through a preloaded booster.
+"""
+from __future__ import annotations
+
+import http.client
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+from benchmarks.bench_api import _free_port, load_test
+
+logger = logging.getLogger("bench_workers")
+
+LAGS = [1, 2, 3, 4, 96]
+
+
+def train_lag_model(models_dir: str, n_rows: int = 20000, num_boost_round: int = 500) -> str:
+    import lightgbm as lgb
+    import pandas as pd
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.random((n_rows, len(LAGS))) * 5, columns=[f"lag_{i}" for i in LAGS])
+    y = X["lag_1"] * 0.8 + X["lag_96"] * 0.2 + rng.normal(0, 0.1, n_rows)
+    booster = lgb.train({"num_leaves": 63, "verbosity": -1}, lgb.Dataset(X, label=y),
+                        num_boost_round=num_boost_round)
+    os.makedirs(models_dir, exist_ok=True)
+    path = os.path.join(models_dir, "lightgbm.txt")
+    booster.save_model(path)
+    return path
+
+
+def _mem_kb(pid: int) -> Dict[str, float]:
+    out = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    out[key.lower()] = float(rest.split()[0])
+    except OSError:
+        pass
+    return out
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def _wait_ready(port: int, timeout: float = 120.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def bench_workers(n_workers: int, models_dir: str, n_requests: int, concurrency: int) -> Dict[str, Any]:
+    port = _free_port()
+    env = {**os.environ, "MODELS_DIR": models_dir}
+    proc = subprocess.Popen([sys.executable, "-m", "src.api.server", "--host", "127.0.0.1",
+                             "--port", str(port), "--workers", str(n_workers), "--log-level", "warning"],
+                            env=env)
+    try:
+        _wait_ready(port)
+        body = json.dumps({"recent_history": list(np.linspace(0, 5, 96)), "model": "lightgbm"}).encode()
+        # warm every worker before measuring memory
+        load_test(port, "/predict", body, "application/json", n_requests=4 * n_workers, concurrency=n_workers)
+        stats = load_test(port, "/predict", body, "application/json", n_requests, concurrency)
+        # with one worker the app is served by the launcher process itself
+        workers = _children(proc.pid) or [proc.pid]
+        mem = [_mem_kb(pid) for pid in workers]
+        rss = [m.get("rss", 0.0) / 1024 for m in mem]
+        pss = [m.get("pss", 0.0) / 1024 for m in mem]
+        parent_pss = _mem_kb(proc.pid).get("pss", 0.0) / 1024 if proc.pid not in workers else 0.0
+        return {
+            **stats,
+            "workers": n_workers,
+            "rss_per_worker_mb": float(np.mean(rss)) if rss else 0.0,
+            "pss_per_worker_mb": float(np.mean(pss)) if pss else 0.0,
+            "pss_total_mb": float(sum(pss) + parent_pss),
+        }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def run_worker_benchmarks(worker_counts: Iterable[int] = (1, 2, 4), n_requests: int = 400,
+                          concurrency: int = 16) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as models_dir:
+        train_lag_model(models_dir)
+        for n in worker_counts:
+            logger.info("Worker benchmark with %s worker(s)", n)
+            results[f"workers_{n}"] = bench_workers(n, models_dir, n_requests, concurrency)
+    return results
@@ -0,0 +1,126 @@
+"""Benchmark harness
+====================
+Timing / memory measurement and result persistence helpers.
+
+Functions
+---------
+- measure(fn, *args, repeat=3, **kwargs) -> (result, dict)
+  Best/mean wall time over `repeat` runs plus peak traced memory of one extra run.
+- percentiles(samples_ms) -> dict
+- environment() -> dict
+- save_results(results, path) / load_results(path)
+- compare(current, baseline) -> list[dict]
+  Ratio current/baseline for every shared numeric metric.
+"""
+from __future__ import annotations
+
+import json
+import os
+import platform
+import resource
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+# Metrics compared between runs; only throughput is "higher is better".
+COMPARED_METRICS = {"wall_s_best", "wall_s_mean", "peak_mem_mb", "throughput_rps",
+                    "p50_ms", "p99_ms", "mean_ms", "response_bytes",
+                    "rss_per_worker_mb", "pss_per_worker_mb", "pss_total_mb"}
+HIGHER_IS_BETTER = {"throughput_rps"}
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def measure(fn: Callable, *args, repeat: int = 3, **kwargs):
+    """Run `fn` repeatedly; wall times are measured without tracemalloc overhead."""
+    times = []
+    result = None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        result = fn(*args, **kwargs)
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    stats = {
+        "wall_s_best": float(min(times)),
+        "wall_s_mean": float(np.mean(times)),
+        "peak_mem_mb": peak / (1024 * 1024),
+        "max_rss_mb": _max_rss_mb(),
+        "repeat": len(times),
+    }
+    return result, stats
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    arr = np.asarray(samples_ms, dtype=float)
+    if arr.size == 0:
+        return {"p50_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0}
+    return {
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p99_ms": float(np.percentile(arr, 99)),
+        "mean_ms": float(arr.mean()),
+    }
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        commit = os.getenv("GIT_COMMIT", "")
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def save_results(results: Dict[str, Any], path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _flatten(d: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}.{k}" if prefix else k
+        if isinstance(v, dict):
+            out.update(_flatten(v, key))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = float(v)
+    return out
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Compare the `results` sections of two runs; ratio > 1 means slower/bigger."""
+    cur = _flatten(current.get("results", {}))
+    base = _flatten(baseline.get("results", {}))
+    rows = []
+    for key in sorted(set(cur) & set(base)):
+        metric = key.rsplit(".", 1)[-1]
+        if metric not in COMPARED_METRICS or base[key] == 0:
+            continue
+        ratio = cur[key] / base[key]
+        regression = ratio < 1 if metric in HIGHER_IS_BETTER else ratio > 1
+        rows.append({"metric": key, "baseline": base[key], "current": cur[key],
+                     "ratio": ratio, "regression": regression})
+    return rows
@@ -0,0 +1,83 @@
+"""Benchmark runner
+===================
+python -m benchmarks.run [--scales 1,10,100] [--models lightgbm,lstm,sarimax]
+                         [--skip-pipeline] [--skip-api] [--skip-serialization]
+                         [--workers 1,2,4]
+                         [--baseline path.json]
+
+Results are written as JSON to `reports/benchmarks/` (one file per run) so two
+runs can be compared with `--baseline`.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime
+
+from benchmarks.harness import compare, environment, load_results, save_results
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("benchmarks")
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Green Pulse benchmark suite")
+    ap.add_argument("--scales", default="1,10,100", help="data size multiples of data/raw")
+    ap.add_argument("--models", default="lightgbm", help="model fits to time (lightgbm,lstm,sarimax or '')")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--skip-pipeline", action="store_true")
+    ap.add_argument("--skip-api", action="store_true")
+    ap.add_argument("--skip-serialization", action="store_true")
+    ap.add_argument("--workers", default="", help="API worker counts to compare, e.g. 1,2,4 (off by default)")
+    ap.add_argument("--horizons", default="96,2880,28800", help="forecast lengths for serialization")
+    ap.add_argument("--out", default=None, help="output JSON (default reports/benchmarks/bench_<ts>.json)")
+    ap.add_argument("--baseline", default=None, help="previous results JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression")
+    return ap.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = {}
+    if not args.skip_pipeline:
+        from benchmarks.bench_pipeline import run_pipeline_benchmarks
+        scales = [int(s) for s in args.scales.split(",") if s]
+        models = [m for m in args.models.split(",") if m]
+        results["pipeline"] = run_pipeline_benchmarks(scales, models=models, repeat=args.repeat)
+    if not args.skip_serialization:
+        from benchmarks.bench_serialization import run_serialization_benchmarks
+        horizons = [int(h) for h in args.horizons.split(",") if h]
+        results["serialization"] = run_serialization_benchmarks(horizons, repeat=args.repeat)
+    if not args.skip_api:
+        from benchmarks.bench_api import run_api_benchmarks
+        results["api"] = run_api_benchmarks(n_requests=args.requests, concurrency=args.concurrency)
+
+    if args.workers:
+        from benchmarks.bench_workers import run_worker_benchmarks
+        counts = [int(w) for w in args.workers.split(",") if w]
+        results["workers"] = run_worker_benchmarks(counts, n_requests=args.requests,
+                                                   concurrency=max(args.concurrency, 2 * max(counts)))
+
+    out = args.out or os.path.join("reports", "benchmarks",
+                                   f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    save_results({"env": environment(), "args": vars(args), "results": results}, out)
+    logger.info("Saved benchmark results to %s", out)
+
+    if args.baseline:
+        rows = compare(load_results(out), load_results(args.baseline))
+        failed = 0
+        for r in rows:
+            worse = r["regression"] and abs(r["ratio"] - 1) > args.tolerance
+            failed += worse
+            flag = "REGRESSION" if worse else ""
+            print(f"{r['metric']:<60} {r['baseline']:>12.4f} -> {r['current']:>12.4f}  x{r['ratio']:.2f} {flag}")
+        return 1 if failed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Synthetic meter data
+=======================
+Generate raw CSV files shaped like `data/raw/KwhConsumptionBlower78_*.csv`
+(columns: index, TxnDate, TxnTime, Consumption) at a multiple of the real size.
+
+Functions
+---------
+- raw_size(raw_dir) -> int
+  Number of data rows in the real raw files (the 1x reference).
+- make_meter_data(out_dir, scale=1, n_files=3, seed=42, base_rows=None) -> list[str]
+  Write `n_files` CSVs totalling `scale * base_rows` rows and return their paths.
+- make_series(n, freq="15min", seed=42) -> pd.DataFrame
+  Regular timestamp/value frame, as uploaded to `/forecast`.
+"""
+from __future__ import annotations
+
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+# Real files: ~3,600 irregular readings over ~2 months (one every ~24 minutes).
+DEFAULT_BASE_ROWS = 3606
+MEAN_GAP_SECONDS = 24 * 60
+
+
+def raw_size(raw_dir: str = "data/raw") -> int:
+    files = sorted(glob.glob(os.path.join(raw_dir, "*.csv")))
+    if not files:
+        return DEFAULT_BASE_ROWS
+    total = 0
+    for f in files:
+        with open(f) as fh:
+            total += sum(1 for _ in fh) - 1
+    return total
+
+
+def _consumption(ts: pd.DatetimeIndex, rng: np.random.Generator) -> np.ndarray:
+    hour = ts.hour.to_numpy() + ts.minute.to_numpy() / 60.0
+    daily = 3.0 + 2.0 * np.sin((hour - 6.0) / 24.0 * 2 * np.pi)
+    weekly = np.where(ts.dayofweek.to_numpy() >= 5, 0.6, 1.0)
+    values = daily * weekly + rng.normal(0.0, 0.4, len(ts))
+    # blower switched off ~10% of the time
+    values[rng.random(len(ts)) < 0.1] = 0.0
+    return np.clip(values, 0.0, None).round(3)
+
+
+def make_meter_data(out_dir: str, scale: int = 1, n_files: int = 3, seed: int = 42,
+                    base_rows: int | None = None) -> list[str]:
+    rng = np.random.default_rng(seed)
+    n = int(scale * (base_rows or DEFAULT_BASE_ROWS))
+    gaps = rng.exponential(MEAN_GAP_SECONDS, n).cumsum()
+    ts = pd.Timestamp("2022-01-01") + pd.to_timedelta(gaps, unit="s")
+    ts = pd.DatetimeIndex(ts).floor("s")
+    df = pd.DataFrame({
+        "TxnDate": ts.strftime("%d %b %Y"),
+        "TxnTime": ts.strftime("%H:%M:%S"),
+        "Consumption": _consumption(ts, rng),
+    })
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i, chunk in enumerate(np.array_split(np.arange(n), n_files), start=1):
+        path = os.path.join(out_dir, f"KwhConsumptionBlower78_{i}.csv")
+        df.iloc[chunk].to_csv(path)
+        paths.append(path)
+    return paths
+
+
+def make_series(n: int, freq: str = "15min", seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range("2022-01-01", periods=n, freq=freq, tz="UTC")
+    return pd.DataFrame({"timestamp": ts, "value": _consumption(ts, rng)})
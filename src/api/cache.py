@@ -0,0 +1,162 @@
+"""Forecast Result Cache
+=======================
+Content-addressed cache for `/predict` and `/forecast` responses.
+
+Keys are a fast hash (blake2b) of the normalized input series plus the model
+name and the model version (fingerprint of the artifact file). Entries live in
+an in-memory LRU bounded by bytes, expire after a TTL, and can optionally be
+mirrored to a local directory so they survive restarts.
+
+Functions / classes
+-------------------
+- series_key(values, model, version, timestamps=None, extra=None) -> str
+- artifact_version(path) -> str
+- ResultCache(max_bytes, ttl_seconds, disk_dir=None)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+
+def series_key(values, model: str, version: str, timestamps=None, extra: Any = None) -> str:
+    """Hash a normalized series (float64 values, int64 ns timestamps) with model identity."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{model}\x00{version}\x00".encode())
+    h.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    if timestamps is not None:
+        h.update(b"\x00ts\x00")
+        h.update(np.ascontiguousarray(timestamps, dtype=np.int64).tobytes())
+    if extra is not None:
+        h.update(json.dumps(extra, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def artifact_version(path: str) -> str:
+    """Version string of a model artifact (mtime + size); changes when the file is rewritten."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "missing"
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+class ResultCache:
+    """Thread-safe LRU (by bytes) + TTL cache with an optional on-disk tier."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 300.0,
+                 disk_dir: Optional[str] = None):
+        self.max_bytes = int(max_bytes)
+        self.ttl_seconds = float(ttl_seconds)
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        # key -> (expires_at, size, model, payload)
+        self._entries: "OrderedDict[str, Tuple[float, int, str, Any]]" = OrderedDict()
+        self._versions: Dict[str, str] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "disk_hits": 0, "evictions": 0,
+                      "expirations": 0, "invalidations": 0}
+
+    # ------------------------------------------------------------------ helpers
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _drop(self, key: str) -> None:
+        _, size, _, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._drop(key)
+            self.stats["evictions"] += 1
+
+    # ------------------------------------------------------------------ public API
+    def observe_version(self, model: str, version: str) -> None:
+        """Drop every entry of `model` when its artifact version changed."""
+        with self._lock:
+            previous = self._versions.get(model)
+            self._versions[model] = version
+            if previous is None or previous == version:
+                return
+            stale = [k for k, (_, _, m, _) in self._entries.items() if m == model]
+            for k in stale:
+                self._drop(k)
+            self.stats["invalidations"] += len(stale)
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[3]
+                self._drop(key)
+                self.stats["expirations"] += 1
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                if os.path.getmtime(path) + self.ttl_seconds > now:
+                    with open(path) as f:
+                        record = json.load(f)
+                    with self._lock:
+                        # entries written under an older artifact version are not served
+                        if self._versions.get(record["model"], record["version"]) == record["version"]:
+                            self.stats["disk_hits"] += 1
+                            self.stats["hits"] += 1
+                            self._store(key, record["model"], record["payload"], now)
+                            return record["payload"]
+                else:
+                    os.remove(path)
+            except (OSError, ValueError, KeyError):
+                pass
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def _store(self, key: str, model: str, payload: Any, now: float) -> int:
+        size = len(json.dumps(payload, default=str))
+        if size > self.max_bytes:
+            return size
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (now + self.ttl_seconds, size, model, payload)
+        self._bytes += size
+        self._evict()
+        return size
+
+    def put(self, key: str, model: str, payload: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._store(key, model, payload, now)
+            version = self._versions.get(model, "")
+        if self.disk_dir:
+            tmp = self._disk_path(key) + ".tmp"
+            try:
+                with open(tmp, "w") as f:
+                    json.dump({"model": model, "version": version, "payload": payload}, f, default=str)
+                os.replace(tmp, self._disk_path(key))
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries), "bytes": self._bytes,
+                    "max_bytes": self.max_bytes, "ttl_seconds": self.ttl_seconds,
+                    "disk_dir": self.disk_dir}
@@ -0,0 +1,177 @@
+"""Forecast helpers
+==================
+Upload parsing, the naive forecast and its uncertainty, shared by `/forecast`
+(api/serve_api.py) and the job pool workers (api/jobs.py). Importing this
+module has no side effects: the interval table and the settings are passed in.
+
+Functions
+---------
+- interval_settings(cfg) -> dict
+  `api.intervals` levels/thresholds (and `data.threshold_on`) with defaults.
+- parse_uploaded_series(content, filename) -> DataFrame[timestamp, value]
+- uncertainty(table, model_name, pred, settings, freq=None) -> dict
+  Conformal bounds, P(ON) and ON/OFF state per forecast step.
+- load_classes(table, model_name, pred, history, settings, freq) -> (confidence, topK)
+- naive_forecast(series, table, settings, horizon=3, freq="1h") -> dict
+  Repeat-last-value forecast payload, without the per-response `inference_ms`/`timestamp`.
+"""
+from __future__ import annotations
+
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+from api.serialization import columnar_series
+
+
+def interval_settings(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    iv_cfg = cfg.get("api", {}).get("intervals", {})
+    return {
+        "levels": tuple(iv_cfg.get("levels", (0.8, 0.95))),
+        "tolerance": float(iv_cfg.get("tolerance", 0.1)),
+        "peak_quantile": float(iv_cfg.get("peak_quantile", 0.9)),
+        "state_confidence": float(iv_cfg.get("state_confidence", 0.9)),
+        "threshold_on": float(cfg.get("data", {}).get("threshold_on", 0.5)),
+    }
+
+
+def parse_uploaded_series(content: bytes, filename: str) -> pd.DataFrame:
+    name = (filename or "").lower()
+    text = content.decode("utf-8", errors="replace")
+    if name.endswith(".json") or text.strip().startswith("["):
+        data = json.loads(text)
+        df = pd.DataFrame(data)
+    else:  # assume CSV
+        df = pd.read_csv(io.StringIO(text))
+    # standardize columns
+    # Expect at least timestamp/value or single numeric column
+    if "timestamp" in df.columns and "value" in df.columns:
+        df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True, errors="coerce")
+        df = df.dropna(subset=["timestamp"])  # drop bad timestamps
+        return df[["timestamp", "value"]]
+    # fallback: take first datetime-like + first numeric
+    datetime_col = None
+    value_col = None
+    for c in df.columns:
+        if datetime_col is None:
+            try:
+                parsed = pd.to_datetime(df[c], utc=True)
+                # consider a column datetime if at least half parse
+                if parsed.notna().mean() > 0.5:
+                    datetime_col = c
+            except Exception:
+                pass
+        if value_col is None and pd.api.types.is_numeric_dtype(df[c]):
+            value_col = c
+    if datetime_col and value_col:
+        out = pd.DataFrame({"timestamp": pd.to_datetime(df[datetime_col], utc=True, errors="coerce"), "value": df[value_col]})
+        out = out.dropna(subset=["timestamp"])  # ensure valid timestamp
+        return out
+    # last resort: generate synthetic timestamps
+    if pd.api.types.is_numeric_dtype(df[df.columns[0]]):
+        n = len(df)
+        base = datetime.now(timezone.utc) - timedelta(minutes=n)
+        ts = [base + timedelta(minutes=i) for i in range(n)]
+        return pd.DataFrame({"timestamp": ts, "value": df[df.columns[0]]})
+    raise ValueError("Unable to parse time series; provide timestamp,value format")
+
+
+def _masked(values, finite) -> list:
+    """`values` as a list, `None` where the forecast step is not finite."""
+    return [v if ok else None for v, ok in zip(np.asarray(values).tolist(), finite.tolist())]
+
+
+def uncertainty(table, model_name: str, pred, settings: Dict[str, Any], freq: Optional[str] = None) -> dict:
+    """Conformal bounds, P(ON) and ON/OFF state per forecast step (point-based without a table).
+
+    Non-finite forecast steps get `null` bounds, P(ON) and state rather than a made-up OFF.
+    """
+    pred = np.asarray(pred, dtype=np.float64)
+    finite = np.isfinite(pred)
+    threshold_on = settings["threshold_on"]
+    if table is None or not table.has(model_name):
+        return {"intervals": {}, "p_on": None, "is_on": _masked((pred >= threshold_on).astype(int), finite)}
+    filled = np.where(finite, pred, threshold_on)  # placeholder, masked out below
+    p_on = table.prob_above(model_name, filled, threshold_on, freq)
+    confident = settings["state_confidence"]
+    is_on = np.where(p_on >= confident, 1, np.where(p_on <= 1 - confident, 0, -1))
+    # consumption is capped at 0 when cleaning the data, so are the bounds
+    intervals = {level: {side: _masked(b, finite) for side, b in sides.items()}
+                 for level, sides in table.bounds(model_name, filled, settings["levels"], freq, floor=0.0).items()}
+    return {
+        "intervals": intervals,
+        "p_on": _masked(np.round(p_on, 4), finite),
+        "is_on": [None if s is None or s < 0 else int(s) for s in _masked(is_on, finite)],
+    }
+
+
+def load_classes(table, model_name: str, pred, history, settings: Dict[str, Any],
+                 freq: str) -> tuple[float | None, list[dict]]:
+    """(confidence, topK) of a forecast from the interval table.
+
+    confidence: mean P(|error| <= tolerance x max(|forecast|, ON threshold)) over the horizon.
+    topK: expected share of the horizon spent above the history's peak quantile
+    ("Pic de charge"), ON below it ("Tendance normale") and OFF ("Arrêt / veille").
+    """
+    if table is None or not table.has(model_name):
+        return None, []
+    threshold_on = settings["threshold_on"]
+    pred = np.asarray(pred, dtype=np.float64)
+    steps = np.isfinite(pred)  # non-finite steps keep their horizon column but are not averaged
+    if not steps.any():
+        return None, []
+    pred = np.where(steps, pred, threshold_on)
+    tol = settings["tolerance"] * np.maximum(np.abs(pred), threshold_on)
+    confidence = float(np.mean(table.abs_error_cdf(model_name, tol, freq)[steps]))
+    finite = history[np.isfinite(history)]
+    peak_level = (max(float(np.quantile(finite, settings["peak_quantile"])), threshold_on)
+                  if len(finite) else threshold_on)
+    p_peak = table.prob_above(model_name, pred, peak_level, freq)[steps]
+    p_on = table.prob_above(model_name, pred, threshold_on, freq)[steps]
+    probs = {
+        "Pic de charge": float(np.mean(p_peak)),
+        "Tendance normale": float(np.mean(np.clip(p_on - p_peak, 0.0, 1.0))),
+        "Arrêt / veille": float(np.mean(1.0 - p_on)),
+    }
+    top_k = [{"label": k, "prob": round(v, 4)} for k, v in sorted(probs.items(), key=lambda kv: -kv[1])]
+    return round(confidence, 4), top_k
+
+
+def naive_forecast(series: pd.DataFrame, table, settings: Dict[str, Any], horizon: int = 3,
+                   freq: str = "1h") -> dict:
+    """Forecast payload for a timestamp-sorted series (see module docstring).
+
+    The `naive-persistence` intervals are the ones calibrated on the training meter and
+    are applied unchanged whatever the scale of the uploaded series.
+    """
+    model_name = "naive-persistence"
+    last_ts = series["timestamp"].iloc[-1]
+    last_val = float(series["value"].iloc[-1])
+    # naive forecast: repeat last value for the next `horizon` periods (columnar,
+    # expanded to timestamp/value points only when rendering plain JSON)
+    values = np.full(horizon, last_val)
+    forecast_points = columnar_series(last_ts + to_offset(freq), freq, values)
+    history = pd.to_numeric(series["value"], errors="coerce").to_numpy(dtype=np.float64)
+    confidence, top_k = load_classes(table, model_name, values, history, settings, freq)
+    # compute simple metrics using naive shift
+    if len(series) > 1:
+        y_true = series["value"].iloc[1:].to_numpy()
+        y_pred = series["value"].shift(1).iloc[1:].to_numpy()
+        mae = float(np.mean(np.abs(y_true - y_pred)))
+        rmse = float(np.sqrt(np.mean((y_true - y_pred) ** 2)))
+    else:
+        mae = rmse = 0.0
+    return {
+        "label": "Prévision énergétique",
+        "confidence": confidence,
+        "topK": top_k,
+        "forecast": forecast_points,
+        **uncertainty(table, model_name, values, settings, freq),
+        "model": model_name,
+        "metrics": {"mae": mae, "rmse": rmse},
+    }
@@ -0,0 +1,529 @@
+"""Forecast Jobs
+===============
+Asynchronous fleet-wide forecast runs, mounted on the API as `/jobs`.
+
+A job is a set of series files (one meter per file, same formats as
+`/forecast`) split into shards of `shard_size` files. Shards run in parallel
+on a local process pool; each finished shard is checkpointed as a Parquet file
+(CSV when pyarrow is missing) and recorded in a SQLite database, so a restart
+or a retry only redoes the shards that are not done. Shards are claimed with an
+atomic UPDATE, so several API worker processes can share the same job store.
+
+Endpoints
+---------
+  POST /jobs                 -> submit paths / glob patterns under the configured data root
+  POST /jobs/upload          -> submit uploaded files (distinct names: one meter per file)
+  GET  /jobs                 -> list jobs
+  GET  /jobs/{id}            -> status and shard progress
+  GET  /jobs/{id}/results    -> NDJSON, one line per meter, streamed as shards finish
+  POST /jobs/{id}/retry      -> requeue failed shards
+"""
+from __future__ import annotations
+
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from api.forecasting import interval_settings, naive_forecast, parse_uploaded_series
+from api.model_store import ModelStore
+from api.serialization import check_freq
+
+logger = logging.getLogger("jobs")
+
+try:  # Parquet checkpoints when available
+    import pyarrow  # noqa: F401
+    RESULT_EXT = ".parquet"
+except ImportError:  # pragma: no cover - depends on environment
+    RESULT_EXT = ".csv"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    params TEXT NOT NULL,
+    n_shards INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shards (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    files TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    owner INTEGER,
+    result_path TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (job_id, idx)
+);
+"""
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+UPLOAD_CHUNK = 1 << 20
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _alive(pid: Optional[int]) -> bool:
+    if not pid or pid == os.getpid():
+        return False  # our own shards cannot be running before resume() in this process
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def meter_id(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def write_table(df: pd.DataFrame, base: str) -> str:
+    """Atomically write a shard result (write to temp file, then rename)."""
+    path = base + RESULT_EXT
+    tmp = path + ".tmp"
+    if RESULT_EXT == ".parquet":
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def read_table(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, parse_dates=["timestamp"])
+
+
+@lru_cache(maxsize=None)
+def _model_store(models_dir: str) -> ModelStore:
+    # one per pool worker: the interval table is parsed once, reloaded when retrained
+    return ModelStore(models_dir)
+
+
+def process_shard(files: List[str], horizon: int, freq: str, out_base: str,
+                  models_dir: Optional[str] = None, settings: Optional[Dict[str, Any]] = None) -> str:
+    """Forecast every file of a shard (runs in a pool worker) and checkpoint the result."""
+    table = _model_store(models_dir).intervals() if models_dir else None
+    settings = settings or interval_settings({})
+    frames = []
+    for path in files:
+        with open(path, "rb") as f:
+            series = parse_uploaded_series(f.read(), path)
+        if series.empty:
+            raise ValueError(f"{path}: series is empty")
+        out = naive_forecast(series.sort_values("timestamp"), table, settings, horizon, freq)
+        fc = out["forecast"]
+        idx = pd.date_range(pd.Timestamp(fc["start"]), periods=fc["periods"], freq=fc["freq"])
+        frame = pd.DataFrame({"meter": meter_id(path), "timestamp": idx, "value": fc["values"]})
+        for level, band in out["intervals"].items():
+            frame[f"lower_{level}"] = band["lower"]
+            frame[f"upper_{level}"] = band["upper"]
+        frames.append(frame)
+    return write_table(pd.concat(frames, ignore_index=True), out_base)
+
+
+class JobStore:
+    """SQLite-backed job/shard state; one short-lived connection per operation (thread-safe)."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(os.path.join(root, "results"), exist_ok=True)
+        os.makedirs(os.path.join(root, "uploads"), exist_ok=True)
+        self.db_path = os.path.join(root, "jobs.sqlite")
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _conn(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:  # commit / rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def create_job(self, files: List[str], params: Dict[str, Any], shard_size: int) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        shards = [files[i:i + shard_size] for i in range(0, len(files), shard_size)]
+        now = _now()
+        with self._conn() as conn:
+            conn.execute("INSERT INTO jobs (id, created_at, params, n_shards) VALUES (?, ?, ?, ?)",
+                         (job_id, now, json.dumps(params), len(shards)))
+            conn.executemany(
+                "INSERT INTO shards (job_id, idx, files, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, i, json.dumps(s), PENDING, now) for i, s in enumerate(shards)])
+        return job_id
+
+    def result_base(self, job_id: str, idx: int) -> str:
+        return os.path.join(self.root, "results", job_id, f"shard_{idx:05d}")
+
+    def shards(self, job_id: str, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        query, args = "SELECT * FROM shards WHERE job_id = ?", [job_id]
+        if status is not None:
+            query += " AND status = ?"
+            args.append(status)
+        with self._conn() as conn:
+            rows = conn.execute(query + " ORDER BY idx", args).fetchall()
+        return [{**dict(r), "files": json.loads(r["files"])} for r in rows]
+
+    def claim_shard(self, job_id: str, idx: int) -> bool:
+        """Atomically move a pending shard to running for this process; False if taken."""
+        with self._conn() as conn:
+            cur = conn.execute(
+                "UPDATE shards SET status = ?, owner = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE job_id = ? AND idx = ? AND status = ?",
+                (RUNNING, os.getpid(), _now(), job_id, idx, PENDING))
+            return cur.rowcount == 1
+
+    def update_shard(self, job_id: str, idx: int, status: str, error: Optional[str] = None,
+                     result_path: Optional[str] = None) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE shards SET status = ?, error = ?, result_path = COALESCE(?, result_path), "
+                "updated_at = ? WHERE job_id = ? AND idx = ?",
+                (status, error, result_path, _now(), job_id, idx))
+
+    def release_shard(self, job_id: str, idx: int) -> None:
+        """Hand a running shard back to the queue without counting the attempt (shutdown)."""
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE shards SET status = ?, attempts = MAX(attempts - 1, 0), owner = NULL, updated_at = ? "
+                "WHERE job_id = ? AND idx = ? AND status = ?",
+                (PENDING, _now(), job_id, idx, RUNNING))
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._conn() as conn:
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM shards WHERE job_id = ? GROUP BY status", (job_id,)).fetchall())
+        counts = {s: counts.get(s, 0) for s in (PENDING, RUNNING, DONE, FAILED)}
+        if counts[DONE] == job["n_shards"]:
+            status = "completed"
+        elif counts[PENDING] or counts[RUNNING]:
+            status = RUNNING if counts[RUNNING] or counts[DONE] or counts[FAILED] else PENDING
+        else:
+            status = FAILED
+        return {
+            "id": job["id"],
+            "created_at": job["created_at"],
+            "params": json.loads(job["params"]),
+            "status": status,
+            "n_shards": job["n_shards"],
+            "shards": counts,
+            "progress": counts[DONE] / job["n_shards"] if job["n_shards"] else 1.0,
+        }
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        with self._conn() as conn:
+            ids = [r["id"] for r in conn.execute("SELECT id FROM jobs ORDER BY created_at DESC")]
+        return [self.get_job(i) for i in ids]
+
+    def reset_failed(self, job_id: str) -> int:
+        with self._conn() as conn:
+            return conn.execute(
+                "UPDATE shards SET status = ?, attempts = 0, updated_at = ? WHERE job_id = ? AND status = ?",
+                (PENDING, _now(), job_id, FAILED)).rowcount
+
+    def reset_orphans(self) -> int:
+        """Requeue running shards whose owning process is gone (crash or restart)."""
+        with self._conn() as conn:
+            rows = conn.execute("SELECT job_id, idx, owner FROM shards WHERE status = ?", (RUNNING,)).fetchall()
+        orphans = [(r["job_id"], r["idx"]) for r in rows if not _alive(r["owner"])]
+        with self._conn() as conn:
+            conn.executemany("UPDATE shards SET status = ?, updated_at = ? WHERE job_id = ? AND idx = ? AND status = ?",
+                             [(PENDING, _now(), j, i, RUNNING) for j, i in orphans])
+        return len(orphans)
+
+    def pending_jobs(self) -> List[str]:
+        with self._conn() as conn:
+            rows = conn.execute("SELECT DISTINCT job_id FROM shards WHERE status = ?", (PENDING,)).fetchall()
+        return [r["job_id"] for r in rows]
+
+
+class JobRunner:
+    """Dispatch pending shards to a process pool; failed shards are retried up to `max_attempts`.
+
+    `models_dir` / `settings` are handed to the workers for the forecast intervals
+    (see api/forecasting.py). Shards interrupted by `shutdown` go back to pending
+    without using an attempt, for the next `resume`.
+    """
+
+    def __init__(self, store: JobStore, workers: int, max_attempts: int = 3, retry_delay: float = 1.0,
+                 models_dir: Optional[str] = None, settings: Optional[Dict[str, Any]] = None):
+        self.store = store
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.models_dir = models_dir
+        self.settings = settings
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._closing = False
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._closing:
+                raise RuntimeError("job runner is shut down")
+            if self._pool is None:
+                # spawn: workers must not inherit the server's threads / model runtimes
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def submit(self, job_id: str) -> None:
+        params = self.store.get_job(job_id)["params"]
+        for shard in self.store.shards(job_id, status=PENDING):
+            self._dispatch(job_id, shard, params)
+
+    def _dispatch(self, job_id: str, shard: Dict[str, Any], params: Dict[str, Any]) -> None:
+        idx = shard["idx"]
+        if self._closing or not self.store.claim_shard(job_id, idx):
+            return  # shutting down, or already taken by another worker process
+        base = self.store.result_base(job_id, idx)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        args = (process_shard, shard["files"], params["horizon"], params["freq"], base,
+                self.models_dir, self.settings)
+        try:
+            try:
+                fut = self.pool.submit(*args)
+            except BrokenProcessPool:
+                with self._lock:
+                    self._pool = None
+                fut = self.pool.submit(*args)
+        except RuntimeError:  # pool shut down meanwhile
+            self.store.release_shard(job_id, idx)
+            return
+        fut.add_done_callback(lambda f: self._done(job_id, shard, params, f))
+
+    def _done(self, job_id: str, shard: Dict[str, Any], params: Dict[str, Any], fut) -> None:
+        idx = shard["idx"]
+        if fut.cancelled():  # dropped by shutdown before it started
+            self.store.release_shard(job_id, idx)
+            return
+        try:
+            self.store.update_shard(job_id, idx, DONE, result_path=fut.result())
+            return
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        if self._closing:  # interrupted (e.g. pool workers killed): not the shard's fault
+            self.store.release_shard(job_id, idx)
+            return
+        attempts = self.store.shards(job_id)[idx]["attempts"]
+        if attempts < self.max_attempts:
+            logger.warning("Job %s shard %s failed (attempt %s), retrying: %s", job_id, idx, attempts, error)
+            self.store.update_shard(job_id, idx, PENDING, error=error)
+            # resubmit from a timer thread (backoff), not from the pool's callback thread
+            timer = threading.Timer(self.retry_delay * attempts, self._dispatch, (job_id, shard, params))
+            timer.daemon = True
+            timer.start()
+        else:
+            logger.error("Job %s shard %s failed: %s", job_id, idx, error)
+            self.store.update_shard(job_id, idx, FAILED, error=error)
+
+    def resume(self) -> List[str]:
+        """Requeue shards interrupted by a restart and restart every job with pending work."""
+        self.store.reset_orphans()
+        jobs = self.store.pending_jobs()
+        for job_id in jobs:
+            self.submit(job_id)
+        return jobs
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closing = True
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+class JobRequest(BaseModel):
+    paths: List[str] = Field(..., description="Series files or glob patterns under the server's data root")
+    horizon: int = Field(96 * 30, ge=1, description="Points to forecast per meter")
+    freq: str = Field("15min", description="Spacing of forecast points (pandas offset alias)")
+    shard_size: Optional[int] = Field(None, ge=1, description="Files per shard")
+
+
+def _runner(request: Request) -> JobRunner:
+    runner = getattr(request.app.state, "job_runner", None)
+    if runner is None:  # set by the app lifespan
+        raise HTTPException(status_code=503, detail="Job runner not started")
+    return runner
+
+
+def _resolve_inputs(paths: List[str], data_root: str) -> List[str]:
+    """Files matched by `paths` (relative to `data_root`, globs allowed); 400 outside the root."""
+    root = os.path.realpath(data_root)
+    files: List[str] = []
+    for p in paths:
+        pattern = os.path.join(root, p)  # absolute paths are kept, and checked like the others
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(p) else [pattern]
+        for m in matches:
+            if os.path.commonpath([os.path.realpath(m), root]) != root:
+                raise HTTPException(status_code=400, detail=f"Path outside the data root: {p}")
+            files.append(os.path.abspath(m))
+    return files
+
+
+def create_router(default_shard_size: int = 16, max_horizon: int = 96 * 365,
+                  data_root: Optional[str] = None, max_file_bytes: int = 64 * 1024 ** 2,
+                  max_upload_bytes: int = 1024 ** 3) -> APIRouter:
+    """`/jobs` routes served by `app.state.job_runner`.
+
+    `POST /jobs` only reads files under `data_root`; `POST /jobs/upload` accepts
+    files up to `max_file_bytes` each and `max_upload_bytes` in total (413 above).
+    """
+    router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+    def _submit(runner: JobRunner, files: List[str], horizon: int, freq: str,
+                shard_size: Optional[int]) -> Dict[str, Any]:
+        if not files:
+            raise HTTPException(status_code=400, detail="No input files")
+        if horizon > max_horizon:
+            raise HTTPException(status_code=400, detail=f"horizon must be <= {max_horizon}")
+        try:
+            check_freq(freq)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid freq: {freq}")
+        try:  # series end unknown until read: checked from now, which recent meter data precedes
+            check_freq(freq, horizon)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        params = {"horizon": horizon, "freq": freq, "n_files": len(files)}
+        job_id = runner.store.create_job(files, params, shard_size or default_shard_size)
+        runner.submit(job_id)
+        return runner.store.get_job(job_id)
+
+    @router.post("")
+    def submit_job(req: JobRequest, runner: JobRunner = Depends(_runner)):
+        if not data_root:
+            raise HTTPException(status_code=403, detail="Server-side paths are disabled; use /jobs/upload")
+        files = _resolve_inputs(req.paths, data_root)
+        missing = [f for f in files if not os.path.isfile(f)]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Files not found: {missing[:5]}")
+        return _submit(runner, files, req.horizon, req.freq, req.shard_size)
+
+    @router.post("/upload")
+    async def submit_upload(files: List[UploadFile] = File(...), horizon: int = Query(96 * 30, ge=1),
+                            freq: str = Query("15min"), shard_size: Optional[int] = Query(None, ge=1),
+                            runner: JobRunner = Depends(_runner)):
+        # the file name is the meter id of the results: one file per meter, named
+        names = [os.path.basename(f.filename or "") for f in files]
+        if any(n in ("", ".", "..") for n in names):
+            raise HTTPException(status_code=400, detail="Every uploaded file needs a file name")
+        duplicates = sorted({n for n in names if names.count(n) > 1})
+        if duplicates:
+            raise HTTPException(status_code=400, detail=f"Duplicate file names: {duplicates[:5]}")
+        upload_dir = os.path.join(runner.store.root, "uploads", uuid.uuid4().hex[:12])
+        os.makedirs(upload_dir, exist_ok=True)
+        paths, total = [], 0
+        try:
+            for name, f in zip(names, files):
+                path, size = os.path.join(upload_dir, name), 0
+                with open(path, "wb") as out:
+                    # streamed in 1 MiB chunks: a worker never holds a whole upload in memory
+                    while chunk := await f.read(UPLOAD_CHUNK):
+                        size += len(chunk)
+                        total += len(chunk)
+                        if size > max_file_bytes or total > max_upload_bytes:
+                            raise HTTPException(status_code=413, detail=(
+                                f"Upload too large: {max_file_bytes} bytes per file, "
+                                f"{max_upload_bytes} in total"))
+                        out.write(chunk)
+                paths.append(path)
+        except HTTPException:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            raise
+        return await run_in_threadpool(_submit, runner, paths, horizon, freq, shard_size)
+
+    @router.get("")
+    def list_jobs(runner: JobRunner = Depends(_runner)):
+        return {"jobs": runner.store.list_jobs()}
+
+    @router.get("/{job_id}")
+    def job_status(job_id: str, runner: JobRunner = Depends(_runner)):
+        store = runner.store
+        job = store.get_job(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        job["errors"] = [{"shard": s["idx"], "error": s["error"], "attempts": s["attempts"]}
+                         for s in store.shards(job_id, status=FAILED)]
+        return job
+
+    @router.post("/{job_id}/retry")
+    def retry_job(job_id: str, runner: JobRunner = Depends(_runner)):
+        store = runner.store
+        if store.get_job(job_id) is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        requeued = store.reset_failed(job_id)
+        runner.submit(job_id)
+        return {**store.get_job(job_id), "requeued": requeued}
+
+    @router.get("/{job_id}/results")
+    def job_results(job_id: str, wait: bool = Query(True, description="Keep streaming until the job ends"),
+                    poll_seconds: float = Query(0.5, gt=0, le=30), runner: JobRunner = Depends(_runner)):
+        store = runner.store
+        if store.get_job(job_id) is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        # sync generator: Starlette iterates it in its threadpool, so the SQLite
+        # polls and Parquet decoding never block the event loop
+        def stream():
+            sent = set()
+            freq = store.get_job(job_id)["params"]["freq"]
+            while True:
+                # read status first so shards finishing meanwhile are picked up next round
+                finished = store.get_job(job_id)["status"] in ("completed", FAILED)
+                for shard in store.shards(job_id, status=DONE):
+                    if shard["idx"] in sent:
+                        continue
+                    sent.add(shard["idx"])
+                    df = read_table(shard["result_path"])
+                    for meter, g in df.groupby("meter", sort=False):
+                        ts = pd.DatetimeIndex(g["timestamp"])
+                        line = {
+                            "meter": meter, "shard": shard["idx"], "start": ts[0].isoformat(),
+                            "freq": freq, "periods": len(g), "values": g["value"].tolist(),
+                        }
+                        levels = [c[len("lower_"):] for c in g.columns if c.startswith("lower_")]
+                        if levels:
+                            line["intervals"] = {lv: {"lower": g[f"lower_{lv}"].tolist(),
+                                                      "upper": g[f"upper_{lv}"].tolist()} for lv in levels}
+                        yield json.dumps(line) + "\n"
+                if finished or not wait:
+                    break
+                time.sleep(poll_seconds)
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    return router
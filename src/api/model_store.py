@@ -0,0 +1,127 @@
+"""Model Store
+=============
+Process-wide registry of loaded model artifacts for the API.
+
+Models are loaded once and reused across requests; an artifact is reloaded when
+its file changes (same mtime+size fingerprint as the result cache). In the
+multi-process server (api/server.py) the parent calls `preload()` before
+forking so LightGBM boosters and SARIMAX results are shared copy-on-write by
+all workers. The Keras LSTM is never loaded in the parent: TensorFlow's runtime
+is not fork-safe, so each worker loads it lazily on first use.
+
+The conformal interval table written by training (utils/intervals.py) is not a
+model: it has its own accessor, `intervals()`, with the same reload-on-change
+rule, so retraining also refreshes the served intervals.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from api.cache import artifact_version
+from utils.intervals import INTERVALS_FILE, IntervalTable
+
+logger = logging.getLogger("model_store")
+
+MODEL_FILES = {
+    "lightgbm": "lightgbm.txt",
+    "lstm": "lstm_model.h5",
+    "sarimax": "sarimax.pkl",
+}
+
+# models whose loaded state can be safely inherited by forked workers
+FORK_SAFE_MODELS = ("lightgbm", "sarimax")
+
+
+def _load_lightgbm(path: str, threads: int):
+    import lightgbm as lgb
+    return lgb.Booster(model_file=path)
+
+
+def _load_sarimax(path: str, threads: int):
+    import joblib
+    return joblib.load(path)
+
+
+def _load_lstm(path: str, threads: int):
+    import tensorflow as tf
+    from tensorflow.keras.models import load_model
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError:
+        pass  # runtime already initialized in this process
+    return load_model(path, compile=False)
+
+
+LOADERS = {
+    "lightgbm": _load_lightgbm,
+    "sarimax": _load_sarimax,
+    "lstm": _load_lstm,
+}
+
+
+class ModelStore:
+    def __init__(self, models_dir: str, threads: Optional[int] = None):
+        self.models_dir = models_dir
+        self.threads = int(threads or os.getenv("OMP_NUM_THREADS", 0) or os.cpu_count() or 1)
+        self._models: Dict[str, Tuple[str, Any]] = {}
+        self._intervals: Optional[Tuple[str, IntervalTable]] = None
+        self._lock = threading.Lock()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.models_dir, MODEL_FILES[name])
+
+    def version(self, name: str) -> str:
+        return artifact_version(self.path(name))
+
+    def get(self, name: str) -> Optional[Any]:
+        """Loaded model for `name`, or None when its artifact is missing."""
+        version = self.version(name)
+        if version == "missing":
+            return None
+        cached = self._models.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with self._lock:
+            cached = self._models.get(name)
+            if cached is None or cached[0] != version:
+                logger.info("Loading %s model from %s", name, self.path(name))
+                cached = (version, LOADERS[name](self.path(name), self.threads))
+                self._models[name] = cached
+        return cached[1]
+
+    def intervals_path(self) -> str:
+        return os.path.join(self.models_dir, INTERVALS_FILE)
+
+    def intervals_version(self) -> str:
+        return artifact_version(self.intervals_path())
+
+    def intervals(self) -> Optional[IntervalTable]:
+        """Conformal interval table, or None before the first calibration."""
+        version = self.intervals_version()
+        if version == "missing":
+            return None
+        cached = self._intervals
+        if cached is None or cached[0] != version:
+            with self._lock:
+                cached = self._intervals
+                if cached is None or cached[0] != version:
+                    logger.info("Loading interval table from %s", self.intervals_path())
+                    cached = self._intervals = (version, IntervalTable.load(self.intervals_path()))
+        return cached[1]
+
+    def preload(self, names: Iterable[str] = FORK_SAFE_MODELS) -> list[str]:
+        loaded = []
+        for name in names:
+            try:
+                if self.get(name) is not None:
+                    loaded.append(name)
+            except Exception as e:
+                logger.error("Preloading %s failed: %s", name, e)
+        return loaded
+
+    def loaded(self) -> Dict[str, str]:
+        return {name: version for name, (version, _) in self._models.items()}
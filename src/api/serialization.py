@@ -0,0 +1,140 @@
+"""Response Serialization
+========================
+Content negotiation for `/predict` and `/forecast`.
+
+Forecast payloads are built internally in a columnar form
+(`{"start": iso, "freq": "1h", "values": [...]}`) and rendered per `Accept`:
+
+- application/json (default): historical shape, `forecast` as a list of
+  `{"timestamp", "value"}` points, encoded with orjson when installed.
+- application/vnd.greenpulse.columnar+json: columnar `forecast` object as is.
+- application/x-msgpack: columnar payload as MessagePack (needs `msgpack`;
+  406 Not Acceptable when it is the only format asked for and is missing).
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import Response
+from pandas.tseries.frequencies import to_offset
+
+try:  # optional fast JSON encoder
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+try:  # optional binary format
+    import msgpack
+except ImportError:  # pragma: no cover - depends on environment
+    msgpack = None
+
+JSON = "application/json"
+COLUMNAR = "application/vnd.greenpulse.columnar+json"
+MSGPACK = "application/x-msgpack"
+
+# media types accepted in the Accept header -> canonical format
+MEDIA_TYPES = {
+    JSON: JSON,
+    COLUMNAR: COLUMNAR,
+    MSGPACK: MSGPACK,
+    "application/msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+}
+
+# suffix appended to ETags so each representation has its own validator
+ETAG_SUFFIX = {JSON: "", COLUMNAR: ".columnar", MSGPACK: ".msgpack"}
+
+
+def available_formats() -> list[str]:
+    return [JSON, COLUMNAR] + ([MSGPACK] if msgpack is not None else [])
+
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    """Pick the response format from an Accept header (q-values honoured, JSON fallback).
+
+    None (-> 406) when the header only asks for formats this install cannot
+    produce, e.g. MessagePack without `msgpack`: falling back to JSON would
+    hand such clients a body they cannot decode.
+    """
+    if not accept:
+        return JSON
+    choices, unavailable = [], False
+    for i, part in enumerate(accept.split(",")):
+        fields = [f.strip() for f in part.split(";")]
+        media, q = fields[0].lower(), 1.0
+        for f in fields[1:]:
+            if f.startswith("q="):
+                try:
+                    q = float(f[2:])
+                except ValueError:
+                    q = 0.0
+        fmt = MEDIA_TYPES.get(media)
+        if fmt is not None and q > 0:
+            if fmt in available_formats():
+                choices.append((-q, i, fmt))
+            else:
+                unavailable = True
+    if choices:
+        return min(choices)[2]
+    return None if unavailable else JSON
+
+
+def check_freq(freq: str, horizon: int = 1, start: Optional[pd.Timestamp] = None) -> str:
+    """Validate a forecast spacing, else ValueError.
+
+    `freq` must be a pandas offset alias with a positive step, and `horizon`
+    steps after `start` (default: now) must stay within the nanosecond
+    timestamp range that date_range and the result tables use.
+    """
+    offset = to_offset(freq)
+    if offset.n <= 0:  # "0h" cannot build a range, "-1h" runs backwards
+        raise ValueError(f"freq must be a positive step: {freq}")
+    start = pd.Timestamp.now(tz="UTC") if start is None else pd.Timestamp(start)
+    try:
+        end = start + offset * horizon
+        in_range = (end.tz_convert(None) if end.tz is not None else end) <= pd.Timestamp.max
+    except (OverflowError, ValueError):  # OutOfBoundsDatetime is a ValueError
+        in_range = False
+    if not in_range:
+        raise ValueError(f"horizon x freq runs past {pd.Timestamp.max.year}: {horizon} x {freq}")
+    return freq
+
+
+def columnar_series(start: pd.Timestamp, freq: str, values) -> Dict[str, Any]:
+    return {
+        "start": start.isoformat(),
+        "freq": freq,
+        "periods": len(values),
+        "values": np.asarray(values, dtype=np.float64).tolist(),
+    }
+
+
+def expand_series(col: Dict[str, Any]) -> list[Dict[str, Any]]:
+    """Columnar series -> list of {"timestamp", "value"} points (ISO-8601 timestamps)."""
+    idx = pd.date_range(pd.Timestamp(col["start"]), periods=col["periods"], freq=col["freq"])
+    if idx.tz is not None and str(idx.tz) == "UTC" and not (idx.microsecond.any() or idx.nanosecond.any()):
+        stamps = [t + "+00:00" for t in np.datetime_as_string(idx.tz_convert(None).values, unit="s").tolist()]
+    else:
+        stamps = [ts.isoformat() for ts in idx]
+    return [{"timestamp": ts, "value": v} for ts, v in zip(stamps, col["values"])]
+
+
+def dumps_json(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=str, separators=(",", ":")).encode()
+
+
+def render(payload: Dict[str, Any], fmt: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Encode a (columnar) payload in the negotiated format."""
+    headers = {**(headers or {}), "Vary": "Accept"}
+    if fmt == MSGPACK:
+        return Response(content=msgpack.packb(payload, use_bin_type=True), media_type=MSGPACK, headers=headers)
+    if fmt == COLUMNAR:
+        return Response(content=dumps_json(payload), media_type=COLUMNAR, headers=headers)
+    if isinstance(payload.get("forecast"), dict):
+        payload = {**payload, "forecast": expand_series(payload["forecast"])}
+    return Response(content=dumps_json(payload), media_type=JSON, headers=headers)
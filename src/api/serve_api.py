@@ -4,31 +4,83 @@ Endpoints:
   GET /health            -> simple liveness
   GET /models            -> list available model artifact files
   GET /metrics/summary   -> return metrics_summary.json if present
+  GET /cache/stats       -> result cache hit/miss counters
   POST /predict          -> one-step prediction given recent history
   POST /forecast         -> upload CSV/JSON time series and return naive forecast + demo metadata
+  /jobs/...              -> asynchronous fleet-wide forecast jobs (see api/jobs.py)
 
 The frontend currently expects /forecast for file uploads returning a rich JSON
 object with keys: label, confidence, topK, forecast[], model, inference_ms, timestamp, metrics.
+
+Requests to /predict and /forecast can be profiled with cProfile: 1 in
+`api.profiling.sample_every` requests, or any request sending `X-Profile: 1`
+outside ENV=prod (see utils/profiling.py).
+
+Responses of /predict and /forecast are cached (see api/cache.py) and carry an
+ETag; clients sending a matching If-None-Match receive 304 Not Modified.
+
+Models are loaded once per process through api/model_store.py; api/server.py
+runs several workers that share the preloaded models copy-on-write.
+
+Both endpoints return calibrated uncertainty: split-conformal interval bounds
+per model and horizon (computed at training time, models/intervals.json, see
+utils/intervals.py), the probability of the ON state and the derived `is_on`
+(1 ON, 0 OFF, null when undecided). /forecast derives `confidence` and the
+`topK` load classes from the same table.
+
+Both endpoints negotiate their encoding from the Accept header (see
+api/serialization.py): plain JSON (default, orjson), a columnar JSON variant
+for long forecasts (`/forecast?horizon=2880&freq=15min`) and MessagePack.
 """
 from __future__ import annotations
 
-import io
 import json
 import os
+import sys
 import time
-from datetime import datetime, timedelta, timezone
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 
-import joblib
 import numpy as np
 import pandas as pd
 import uvicorn
 import yaml
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi import FastAPI, File, HTTPException, Query, Request, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from tensorflow.keras.models import load_model
 from pydantic import BaseModel, Field
 
-app = FastAPI(title="Green Pulse - Energy Forecast API", version="0.2.0")
+# Make sibling modules importable whether this file is loaded as `api.serve_api`,
+# `src.api.serve_api` or executed directly.
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from api.cache import ResultCache, series_key  # noqa: E402
+from api.forecasting import interval_settings, naive_forecast, parse_uploaded_series, uncertainty  # noqa: E402
+from api.jobs import JobRunner, JobStore, create_router  # noqa: E402
+from api.model_store import MODEL_FILES, ModelStore  # noqa: E402
+from api.serialization import ETAG_SUFFIX, available_formats, check_freq, negotiate, render  # noqa: E402
+from utils.intervals import INTERVALS_FILE  # noqa: E402
+from utils.profiling import RequestProfiler  # noqa: E402
+from utils.resources import cpu_quota  # noqa: E402
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # job state and pool are per process (each api/server.py worker has its own), never built at import
+    runner = JobRunner(JobStore(os.getenv("JOBS_DIR", jobs_cfg.get("dir", "jobs"))),
+                       workers=_job_workers(), max_attempts=int(jobs_cfg.get("max_attempts", 3)),
+                       models_dir=models_dir, settings=INTERVAL_SETTINGS)
+    app.state.job_runner = runner
+    # pick up jobs interrupted by a restart; shards already done are not redone
+    resumed = runner.resume()
+    if resumed:
+        print(f"[INFO] Resumed forecast jobs: {resumed}")
+    yield
+    runner.shutdown()
+
+
+app = FastAPI(title="Green Pulse - Energy Forecast API", version="0.2.0", lifespan=lifespan)
 
 # CORS for local development: allow frontend origin
 app.add_middleware(
@@ -53,22 +105,78 @@ except Exception as e:  # allow app start even if config missing (tests can mock
     cfg = {"paths": {"models_dir": "models", "reports_dir": "reports"}}
     print(f"[WARN] Failed to load config: {e}")
 
-models_dir = cfg["paths"].get("models_dir", "models")
+models_dir = os.getenv("MODELS_DIR", cfg["paths"].get("models_dir", "models"))
 reports_dir = cfg["paths"].get("reports_dir", "reports")
 
+cache_cfg = cfg.get("api", {}).get("cache", {})
+CACHE_ENABLED = bool(cache_cfg.get("enabled", True))
+result_cache = ResultCache(max_bytes=cache_cfg.get("max_bytes", 64 * 1024 * 1024),
+                           ttl_seconds=cache_cfg.get("ttl_seconds", 300),
+                           disk_dir=cache_cfg.get("disk_dir"))
+
+request_profiler = RequestProfiler(cfg)
+
+MAX_HORIZON = int(cfg.get("api", {}).get("max_horizon", 96 * 365))
+
+INTERVAL_SETTINGS = interval_settings(cfg)
+
+jobs_cfg = cfg.get("jobs", {})
+app.include_router(create_router(default_shard_size=int(jobs_cfg.get("shard_size", 16)),
+                                 max_horizon=MAX_HORIZON,
+                                 data_root=os.getenv("JOBS_DATA_ROOT", jobs_cfg.get("data_root")),
+                                 max_file_bytes=int(jobs_cfg.get("max_file_bytes", 64 * 1024 ** 2)),
+                                 max_upload_bytes=int(jobs_cfg.get("max_upload_bytes", 1024 ** 3))))
+
+def _job_workers() -> int:
+    """Job pool size of this process: `jobs.workers`, else its share of the CPU quota.
+
+    api/server.py exports the number of API workers as WEB_CONCURRENCY; every
+    worker runs its own pool, so together they stay within the quota.
+    """
+    if jobs_cfg.get("workers"):
+        return int(jobs_cfg["workers"])
+    api_workers = os.getenv("WEB_CONCURRENCY", "1")
+    return max(1, cpu_quota() // (int(api_workers) if api_workers.isdigit() else 1))
+
+# Loaded once per process (or once in the parent of api/server.py, shared by forked workers)
+model_store = ModelStore(models_dir)
+
+def _model_version(model_name: str) -> str:
+    """Artifact fingerprint used in cache keys; builtin models have a fixed version.
+
+    The interval table is part of every response, so recalibrating changes it too.
+    """
+    version = model_store.version(model_name) if model_name in MODEL_FILES else app.version
+    version = f"{version}+{model_store.intervals_version()}"
+    result_cache.observe_version(model_name, version)
+    return version
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # "*" is a precondition on resource existence, not a cache validator: ignored on POST
+    return etag in [t.strip() for t in header.split(",") if t.strip() != "*"]
+
+# /predict models -> display name; LSTM windows are one day of 15 min steps
+PREDICT_MODELS = {"persistence": "Persistence", "lightgbm": "LightGBM", "lstm": "LSTM", "sarimax": "SARIMAX"}
+LSTM_LOOKBACK = 96
+
 class PredictRequest(BaseModel):
     recent_history: list[float] = Field(..., description="Recent consumption values, most recent last")
     model: str = Field("lightgbm", description="Model identifier: lightgbm|lstm|sarimax|persistence")
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "time": datetime.now(timezone.utc).isoformat()}
+    return {"status": "ok", "time": datetime.now(timezone.utc).isoformat(), "pid": os.getpid(),
+            "loaded_models": model_store.loaded()}
 
 @app.get("/models")
 def list_models():
     if not os.path.isdir(models_dir):
         return {"models": []}
-    files = [f for f in os.listdir(models_dir) if os.path.isfile(os.path.join(models_dir, f))]
+    files = [f for f in os.listdir(models_dir)
+             if os.path.isfile(os.path.join(models_dir, f)) and f != INTERVALS_FILE]
     return {"models": files}
 
 @app.get("/metrics/summary")
@@ -80,40 +188,89 @@ def metrics_summary():
         data = json.load(f)
     return data
 
+@app.get("/cache/stats")
+def cache_stats():
+    return {"enabled": CACHE_ENABLED, **result_cache.snapshot()}
+
 @app.post("/predict")
-def predict(req: PredictRequest):
+def predict(req: PredictRequest, request: Request):
     if not req.recent_history:
         raise HTTPException(status_code=400, detail="recent_history is empty")
     model_name = req.model.lower()
-    recent = req.recent_history
+    _check_predict(model_name, req.recent_history)
+    with request_profiler.profile("predict", request.headers) as prof:
+        key = series_key(req.recent_history, model_name, _model_version(model_name)) if CACHE_ENABLED else None
+        resp = _respond(request, model_name, key, lambda: _predict(model_name, req.recent_history))
+    return _with_profile_header(resp, prof)
+
+def _check_predict(model_name: str, recent: list[float]) -> None:
+    """Errors `_predict` would raise for this request, raised before any ETag/cache lookup."""
+    if model_name not in PREDICT_MODELS:
+        raise HTTPException(status_code=400, detail="Unsupported model")
+    if model_name in MODEL_FILES and model_store.version(model_name) == "missing":
+        raise HTTPException(status_code=404, detail=f"{PREDICT_MODELS[model_name]} model file missing")
+    if model_name == "lstm" and len(recent) < LSTM_LOOKBACK:
+        raise HTTPException(status_code=400, detail=f"lstm needs at least {LSTM_LOOKBACK} values")
+
+def _respond(request: Request, model_name: str, key: str | None, compute, stamp=None) -> Response:
+    """Serve from cache (ETag/304 aware) or compute, then render in the negotiated format.
+
+    Callers validate the model and input first: a 304 only ever stands in for a 200.
+
+    `stamp(payload)` adds the per-response fields (timing, timestamp); they are
+    never stored, so cache hits report when and how fast they were served.
+    """
+    fmt = negotiate(request.headers.get("accept"))
+    if fmt is None:
+        raise HTTPException(status_code=406, detail=f"Acceptable formats: {', '.join(available_formats())}")
+    stamp = stamp or (lambda payload: payload)
+    if key is None:
+        return render(stamp(compute()), fmt)
+    etag = f'"{key}{ETAG_SUFFIX[fmt]}"'
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept"})
+    payload = result_cache.get(key)
+    hit = payload is not None
+    if not hit:
+        payload = compute()
+        result_cache.put(key, model_name, payload)
+    return render(stamp(payload), fmt, {"ETag": etag, "X-Cache": "HIT" if hit else "MISS"})
+
+def _with_profile_header(response: Response, prof: dict) -> Response:
+    if prof.get("file"):
+        response.headers["X-Profile-File"] = os.path.basename(prof["file"])
+    return response
+
+def _predict(model_name: str, recent: list[float]) -> dict:
+    out = _point_predict(model_name, recent)
+    out.update(uncertainty(model_store.intervals(), model_name, out["predictions"], INTERVAL_SETTINGS))
+    return out
+
+def _point_predict(model_name: str, recent: list[float]) -> dict:
     # persistence baseline
     if model_name == "persistence":
         return {"predictions": [float(recent[-1])], "model": "persistence"}
     # dispatch
     try:
         if model_name == "lightgbm":
-            import lightgbm as lgb
-            model_path = os.path.join(models_dir, "lightgbm.txt")
-            if not os.path.exists(model_path):
+            model = model_store.get("lightgbm")
+            if model is None:
                 raise HTTPException(status_code=404, detail="LightGBM model file missing")
-            model = lgb.Booster(model_file=model_path)
             lags = {f"lag_{i}": (recent[-i] if len(recent) >= i else recent[-1]) for i in [1,2,3,4,96]}
             X = pd.DataFrame([lags])
-            pred = model.predict(X)[0]
+            pred = model.predict(X, num_threads=model_store.threads)[0]
             return {"predictions": [float(pred)], "model": "lightgbm"}
         if model_name == "lstm":
-            model_path = os.path.join(models_dir, "lstm_model.h5")
-            if not os.path.exists(model_path):
+            model = model_store.get("lstm")
+            if model is None:
                 raise HTTPException(status_code=404, detail="LSTM model file missing")
-            model = load_model(model_path)
-            arr = np.array(recent[-96:]).reshape((1, 96, 1))
+            arr = np.array(recent[-LSTM_LOOKBACK:]).reshape((1, LSTM_LOOKBACK, 1))
             p = model.predict(arr).ravel().tolist()
             return {"predictions": [float(p[-1])], "sequence": p, "model": "lstm"}
         if model_name == "sarimax":
-            sarimax_path = os.path.join(models_dir, "sarimax.pkl")
-            if not os.path.exists(sarimax_path):
+            res = model_store.get("sarimax")
+            if res is None:
                 raise HTTPException(status_code=404, detail="SARIMAX model file missing")
-            res = joblib.load(sarimax_path)
             p = res.get_forecast(steps=1).predicted_mean.tolist()
             return {"predictions": p, "model": "sarimax"}
     except HTTPException:
@@ -122,86 +279,52 @@ def predict(req: PredictRequest):
         raise HTTPException(status_code=500, detail=f"Model inference error: {e}")
     raise HTTPException(status_code=400, detail="Unsupported model")
 
-def _parse_uploaded_series(content: bytes, filename: str) -> pd.DataFrame:
-    name = (filename or "").lower()
-    text = content.decode("utf-8", errors="replace")
-    if name.endswith(".json") or text.strip().startswith("["):
-        data = json.loads(text)
-        df = pd.DataFrame(data)
-    else:  # assume CSV
-        df = pd.read_csv(io.StringIO(text))
-    # standardize columns
-    # Expect at least timestamp/value or single numeric column
-    if "timestamp" in df.columns and "value" in df.columns:
-        df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True, errors="coerce")
-        df = df.dropna(subset=["timestamp"])  # drop bad timestamps
-        return df[["timestamp", "value"]]
-    # fallback: take first datetime-like + first numeric
-    datetime_col = None
-    value_col = None
-    for c in df.columns:
-        if datetime_col is None:
-            try:
-                parsed = pd.to_datetime(df[c], utc=True)
-                # consider a column datetime if at least half parse
-                if parsed.notna().mean() > 0.5:
-                    datetime_col = c
-            except Exception:
-                pass
-        if value_col is None and pd.api.types.is_numeric_dtype(df[c]):
-            value_col = c
-    if datetime_col and value_col:
-        out = pd.DataFrame({"timestamp": pd.to_datetime(df[datetime_col], utc=True, errors="coerce"), "value": df[value_col]})
-        out = out.dropna(subset=["timestamp"])  # ensure valid timestamp
-        return out
-    # last resort: generate synthetic timestamps
-    if pd.api.types.is_numeric_dtype(df[df.columns[0]]):
-        n = len(df)
-        base = datetime.now(timezone.utc) - timedelta(minutes=n)
-        ts = [base + timedelta(minutes=i) for i in range(n)]
-        return pd.DataFrame({"timestamp": ts, "value": df[df.columns[0]]})
-    raise ValueError("Unable to parse time series; provide timestamp,value format")
-
 @app.post("/forecast")
-async def forecast(file: UploadFile = File(...)):
+async def forecast(request: Request, file: UploadFile = File(...),
+                   horizon: int = Query(3, ge=1, le=MAX_HORIZON, description="Number of future points"),
+                   freq: str = Query("1h", description="Spacing of future points (pandas offset alias)")):
     start = time.time()
+    try:
+        check_freq(freq)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid freq: {freq}")
     content = await file.read()
+    with request_profiler.profile("forecast", request.headers) as prof:
+        resp = _cached_forecast(content, file.filename, start, horizon, freq, request)
+    return _with_profile_header(resp, prof)
+
+def _cached_forecast(content: bytes, filename: str, start: float, horizon: int, freq: str,
+                     request: Request) -> Response:
     try:
-        series = _parse_uploaded_series(content, file.filename)
+        series = parse_uploaded_series(content, filename)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     if series.empty:
         raise HTTPException(status_code=400, detail="Uploaded series is empty")
     series = series.sort_values("timestamp")
-    last_ts = series["timestamp"].iloc[-1]
-    last_val = float(series["value"].iloc[-1])
-    # naive forecast: repeat last value for next 3 periods (hourly guess)
-    horizon = [last_ts + timedelta(hours=i+1) for i in range(3)]
-    forecast_points = [{"timestamp": ts.isoformat(), "value": last_val} for ts in horizon]
-    # compute simple metrics using naive shift
-    if len(series) > 1:
-        y_true = series["value"].iloc[1:].to_numpy()
-        y_pred = series["value"].shift(1).iloc[1:].to_numpy()
-        mae = float(np.mean(np.abs(y_true - y_pred)))
-        rmse = float(np.sqrt(np.mean((y_true - y_pred) ** 2)))
-    else:
-        mae = rmse = 0.0
-    inference_ms = int((time.time() - start) * 1000)
-    resp = {
-        "label": "Prévision énergétique",
-        "confidence": 0.75,  # placeholder heuristic
-        "topK": [
-            {"label": "Pic de charge", "prob": 0.6},
-            {"label": "Tendance normale", "prob": 0.3},
-            {"label": "Anomalie possible", "prob": 0.1},
-        ],
-        "forecast": forecast_points,
-        "model": "naive-persistence",
-        "inference_ms": inference_ms,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "metrics": {"mae": mae, "rmse": rmse},
-    }
-    return resp
+    try:
+        check_freq(freq, horizon, series["timestamp"].iloc[-1])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    model_name = "naive-persistence"
+    key = None
+    if CACHE_ENABLED:
+        key = series_key(pd.to_numeric(series["value"], errors="coerce").to_numpy(dtype=np.float64),
+                         model_name, _model_version(model_name),
+                         timestamps=series["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64),
+                         extra={"horizon": horizon, "freq": freq})
+    return _respond(request, model_name, key, lambda: _forecast(series, start, horizon, freq, stamped=False),
+                    stamp=lambda payload: _stamp(payload, start))
+
+def _stamp(payload: dict, start: float) -> dict:
+    """Copy of `payload` with this response's `inference_ms` and `timestamp`."""
+    return {**payload, "inference_ms": int((time.time() - start) * 1000),
+            "timestamp": datetime.now(timezone.utc).isoformat()}
+
+def _forecast(series: pd.DataFrame, start: float, horizon: int = 3, freq: str = "1h",
+              stamped: bool = True) -> dict:
+    resp = naive_forecast(series, model_store.intervals(), INTERVAL_SETTINGS, horizon, freq)
+    return _stamp(resp, start) if stamped else resp
 
 if __name__ == "__main__":  # pragma: no cover
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
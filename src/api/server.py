@@ -0,0 +1,156 @@
+"""Multi-process API server
+=========================
+Pre-fork launcher for `serve_api.app`:
+
+1. size workers and per-worker math threads from the container CPU quota
+   (cgroup v2/v1, else CPU affinity) and export OMP/MKL/TF thread variables
+   before any numeric library is imported,
+2. import the app and preload fork-safe models (LightGBM, SARIMAX) once,
+3. bind the listening socket, freeze the GC heap and fork the workers, which
+   all `accept()` on the shared socket and share the model pages copy-on-write.
+
+The parent only supervises: dead workers are restarted, SIGTERM/SIGINT are
+forwarded. With `--workers 1` the app is served in-process.
+
+Usage:
+  python -m src.api.server [--host 0.0.0.0] [--port 8000] [--workers auto] [--threads auto]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+from typing import Dict, Optional, Tuple
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from utils.resources import cpu_quota  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("server")
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                   "TF_NUM_INTRAOP_THREADS")
+
+
+def plan_resources(workers: str | int | None = "auto", threads: str | int | None = "auto",
+                   cpus: Optional[int] = None) -> Tuple[int, int]:
+    """Workers default to one per CPU; threads split the remaining CPUs so workers x threads <= CPUs."""
+    cpus = cpus or cpu_quota()
+    n_workers = cpus if workers in (None, "auto") else max(1, int(workers))
+    n_threads = max(1, cpus // n_workers) if threads in (None, "auto") else max(1, int(threads))
+    return n_workers, n_threads
+
+
+def configure_threads(threads: int) -> None:
+    # explicit user settings win; must run before numpy/lightgbm/tensorflow are imported
+    for var in THREAD_ENV_VARS:
+        os.environ.setdefault(var, str(threads))
+    os.environ.setdefault("TF_NUM_INTEROP_THREADS", "1")
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _serve(app, sock: socket.socket, log_level: str) -> None:
+    import uvicorn
+    config = uvicorn.Config(app, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _spawn(app, sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:  # worker
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        code = 0
+        try:
+            _serve(app, sock, log_level)
+        except Exception:
+            logger.exception("Worker %s crashed", os.getpid())
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def run(host: str = "0.0.0.0", port: int = 8000, workers: str | int = "auto",
+        threads: str | int = "auto", log_level: str = "info") -> None:
+    n_workers, n_threads = plan_resources(workers, threads)
+    configure_threads(n_threads)
+    os.environ["WEB_CONCURRENCY"] = str(n_workers)  # job pools split the CPU quota between workers
+    logger.info("Serving with %s worker(s) x %s thread(s) (cpu quota %s)", n_workers, n_threads, cpu_quota())
+
+    from api import serve_api
+    serve_api.model_store.threads = n_threads
+    loaded = serve_api.model_store.preload()
+    if serve_api.model_store.intervals() is not None:  # plain arrays: fork-safe
+        loaded.append("intervals")
+    logger.info("Preloaded models shared by workers: %s", loaded or "none")
+
+    sock = bind_socket(host, port)
+    if n_workers == 1:
+        _serve(serve_api.app, sock, log_level)
+        return
+
+    # move everything allocated so far out of GC tracking so collections in the
+    # workers do not touch (and un-share) the parent's pages
+    gc.collect()
+    gc.freeze()
+
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    for slot in range(n_workers):
+        children[_spawn(serve_api.app, sock, log_level)] = slot
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if slot is not None and not stopping:
+            logger.warning("Worker %s exited (status %s); restarting", pid, status)
+            children[_spawn(serve_api.app, sock, log_level)] = slot
+    sock.close()
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Green Pulse multi-process API server")
+    ap.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    ap.add_argument("--workers", default=os.getenv("WEB_CONCURRENCY", "auto"))
+    ap.add_argument("--threads", default=os.getenv("THREADS_PER_WORKER", "auto"))
+    ap.add_argument("--log-level", default="info")
+    args = ap.parse_args(argv)
+    run(args.host, args.port, args.workers, args.threads, args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,19 @@
 # src/data/data_load.py
+import sys
+from pathlib import Path
+
+# Make `utils` importable when this file is executed directly (python src/...)
+SRC_DIR = Path(__file__).resolve().parents[1]
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
 import os
 import glob
 import logging
 import pandas as pd
 import yaml
-from pathlib import Path
+
+from utils.profiling import StageProfiler
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("data_load")
@@ -13,8 +22,8 @@ def load_config():
     with open("configs/params.yaml", "r") as f:
         return yaml.safe_load(f)
 
-def read_and_concat(raw_dir, date_col, time_col, consumption_col, dayfirst=True):
-    files = sorted(glob.glob(os.path.join(raw_dir, "*.csv")))
+def read_and_concat(raw_dir, date_col, time_col, consumption_col, dayfirst=True, files=None):
+    files = files or sorted(glob.glob(os.path.join(raw_dir, "*.csv")))
     if not files:
         raise FileNotFoundError(f"No CSV files found in {raw_dir}")
     dfs = []
@@ -55,20 +64,25 @@ def resample_and_clean(df, freq, fillna_method, threshold_on):
 
 def main():
     cfg = load_config()
+    prof = StageProfiler("data_load", cfg)
     p = cfg["paths"]
     d = cfg["data"]
     raw_dir = p["raw_dir"]
     out_dir = p["processed_dir"]
     os.makedirs(out_dir, exist_ok=True)
-    df = read_and_concat(raw_dir,
-                         date_col=d["datetime_cols"]["date_col"],
-                         time_col=d["datetime_cols"]["time_col"],
-                         consumption_col=d["consumption_col"],
-                         dayfirst=d.get("dayfirst", True))
-    res = resample_and_clean(df, d["resample_freq"], d["fillna_method"], d["threshold_on"])
+    with prof.stage("read_and_concat"):
+        df = read_and_concat(raw_dir,
+                             date_col=d["datetime_cols"]["date_col"],
+                             time_col=d["datetime_cols"]["time_col"],
+                             consumption_col=d["consumption_col"],
+                             dayfirst=d.get("dayfirst", True))
+    with prof.stage("resample_and_clean"):
+        res = resample_and_clean(df, d["resample_freq"], d["fillna_method"], d["threshold_on"])
     out_file = os.path.join(out_dir, "clean_data.csv")
-    res.to_csv(out_file, index=True)
+    with prof.stage("save"):
+        res.to_csv(out_file, index=True)
     logger.info(f"Saved cleaned data to {out_file}")
+    prof.save()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
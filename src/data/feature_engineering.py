@@ -1,4 +1,12 @@
 # src/data/feature_engineering.py
+import sys
+from pathlib import Path
+
+# Make `utils` importable when this file is executed directly (python src/...)
+SRC_DIR = Path(__file__).resolve().parents[1]
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
 import os
 import logging
 import pandas as pd
@@ -7,6 +15,8 @@ import joblib
 import yaml
 from sklearn.preprocessing import StandardScaler, MinMaxScaler
 
+from utils.profiling import StageProfiler
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("feature_engineering")
 
@@ -45,6 +55,7 @@ def scale_features(X, method="standard", save_path=None):
 
 def main():
     cfg = load_config()
+    prof = StageProfiler("feature_engineering", cfg)
     p = cfg["paths"]
     data_file = p["processed_dir"] + "/clean_data.csv"
     out_features = p["features_file"]
@@ -52,11 +63,14 @@ def main():
     os.makedirs(os.path.dirname(out_features), exist_ok=True)
     os.makedirs(p["artifacts_dir"], exist_ok=True)
 
-    df = pd.read_csv(data_file, index_col=0, parse_dates=True)
+    with prof.stage("read"):
+        df = pd.read_csv(data_file, index_col=0, parse_dates=True)
     df.index.name = "datetime"
 
-    df = create_time_features(df)
-    df = create_lags_rolls(df, lags=[1,2,3,4,96], windows=[4,8,96])
+    with prof.stage("create_time_features"):
+        df = create_time_features(df)
+    with prof.stage("create_lags_rolls"):
+        df = create_lags_rolls(df, lags=[1,2,3,4,96], windows=[4,8,96])
 
     # drop na after lagging
     df = df.dropna()
@@ -65,14 +79,17 @@ def main():
     X = df.drop(columns=[target_col])
     y = df[[target_col]]
 
-    X_scaled, scaler = scale_features(X, method=cfg["training"].get("scale_method", "standard"),
-                                     save_path=scaler_path)
+    with prof.stage("scale_features"):
+        X_scaled, scaler = scale_features(X, method=cfg["training"].get("scale_method", "standard"),
+                                         save_path=scaler_path)
     if scaler is not None:
         logger.info(f"Scaler saved to {scaler_path}")
     # Save combined features
     features = pd.concat([X_scaled.reset_index(drop=False).set_index("datetime"), y.reset_index(drop=False).set_index("datetime")], axis=1)
-    features.to_csv(out_features)
+    with prof.stage("save"):
+        features.to_csv(out_features)
     logger.info(f"Saved features to {out_features}")
+    prof.save()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -21,7 +21,7 @@ def create_sequences(X, y, lookback=24):
     return np.array(Xs), np.array(ys)
 
 
-def time_train_test_split(df, test_days, freq="15T"):
+def time_train_test_split(df, test_days, freq="15min"):
     # split by last test_days
     # compute periods in a day
     periods_per_day = int(pd.Timedelta("1D") / pd.Timedelta(freq))
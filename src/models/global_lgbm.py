@@ -0,0 +1,358 @@
+"""Global LightGBM
+=================
+One LightGBM model for the whole meter fleet, trained out-of-core.
+
+Layout
+------
+- `prepare`: every raw CSV under `paths.fleet_raw_dir` (required, no default) is
+  one meter, named after the file. The directory must hold exactly one file per
+  meter: `data/raw` does not qualify, its files are time segments of a single
+  meter (read those with data_load instead). Meters are
+  cleaned and featurized one at a time (same steps as data_load /
+  feature_engineering, unscaled) and written to
+  `<paths.fleet_features_dir>/<meter_id>.parquet` in row groups of
+  `rows_per_chunk` rows, so memory is bounded by a single meter.
+- `train`: each meter file is wrapped in a `lightgbm.Sequence` that decodes one
+  row group at a time. LightGBM samples rows for the bin boundaries, then pushes
+  the rows batch by batch into its binned representation; the float matrix of
+  the fleet never exists in memory. The meter id is appended as a categorical
+  feature. The last `training.test_size_days` of each meter form the validation
+  set (binned with the training set as reference).
+- Constructed datasets are saved as LightGBM binary files in the training
+  matrix cache (utils/matrix_cache.py) and reloaded on the next run while the
+  feature files and binning parameters are unchanged.
+
+Usage:
+  python -m src.models.global_lgbm prepare [--raw-dir data/meters]
+  python -m src.models.global_lgbm train
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence as Seq, Tuple
+
+SRC_DIR = Path(__file__).resolve().parents[1]
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import yaml
+
+from utils.matrix_cache import LGB_DATASET_PARAMS, MatrixCache, from_config
+from utils.metrics import metrics
+from utils.mlflow_utils import get_tracker
+from utils.profiling import StageProfiler
+from utils.resources import cpu_quota
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("global_lgbm")
+
+METER_FEATURE = "meter_id"
+MODEL_FILE = "lightgbm_global.txt"
+METERS_FILE = "lightgbm_global.meters.json"
+
+# defaults for many-core CPUs: few features x many rows -> column-wise histograms,
+# 63 bins keep histograms in cache and halve their build/subtract cost vs 255
+DEFAULT_PARAMS = {
+    "objective": "regression",
+    "max_bin": 63,
+    "min_data_in_bin": 16,
+    "bin_construct_sample_cnt": 200000,
+    "force_col_wise": True,
+    "min_data_in_leaf": 100,
+    "max_cat_threshold": 64,
+    "feature_pre_filter": False,
+    "verbosity": -1,
+}
+
+
+def load_configs():
+    with open("configs/params.yaml") as f:
+        cfg = yaml.safe_load(f)
+    with open("configs/experiments.yaml") as f:
+        exp = yaml.safe_load(f)
+    return cfg, exp
+
+
+def train_params(conf: Dict[str, Any], cpus: Optional[int] = None) -> Dict[str, Any]:
+    """Experiment params on top of DEFAULT_PARAMS; `num_threads: null` uses the CPU quota."""
+    params = {**DEFAULT_PARAMS, **{k: v for k, v in (conf or {}).items() if v is not None}}
+    if "num_threads" not in params:
+        params["num_threads"] = cpus or cpu_quota()
+    return params
+
+
+# --------------------------------------------------------------------------- prepare
+
+def meter_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Time + lag/rolling features of one cleaned meter series (float32, no scaling)."""
+    from data.feature_engineering import create_lags_rolls, create_time_features
+
+    # is_on is derived from the target at the same timestamp, so it is not a feature here
+    df = create_lags_rolls(create_time_features(df[["consumption"]]))
+    return df.dropna().astype(np.float32)
+
+
+def write_meter_chunks(features: pd.DataFrame, path: str, rows_per_chunk: int = 65536) -> str:
+    """Write one meter's features as Parquet row groups of `rows_per_chunk` rows (atomic)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(features, preserve_index=True)
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp, row_group_size=rows_per_chunk)
+    os.replace(tmp, path)
+    return path
+
+
+def prepare_fleet(cfg: Dict[str, Any], rows_per_chunk: int = 65536) -> List[str]:
+    from data.data_load import read_and_concat, resample_and_clean
+
+    p, d = cfg["paths"], cfg["data"]
+    raw_dir = p.get("fleet_raw_dir")
+    if not raw_dir:
+        raise ValueError("paths.fleet_raw_dir is not set: point it to a directory with one CSV per meter")
+    out_dir = p["fleet_features_dir"]
+    os.makedirs(out_dir, exist_ok=True)
+    files = sorted(glob.glob(os.path.join(raw_dir, "*.csv")))
+    if not files:
+        raise FileNotFoundError(f"No CSV files found in {raw_dir}")
+    written = []
+    for f in files:
+        meter_id = Path(f).stem
+        raw = read_and_concat(os.path.dirname(f), d["datetime_cols"]["date_col"], d["datetime_cols"]["time_col"],
+                              d["consumption_col"], dayfirst=d.get("dayfirst", True), files=[f])
+        clean = resample_and_clean(raw, d["resample_freq"], d["fillna_method"], d["threshold_on"])
+        written.append(write_meter_chunks(meter_features(clean),
+                                          os.path.join(out_dir, f"{meter_id}.parquet"), rows_per_chunk))
+        logger.info("Prepared meter %s (%s rows)", meter_id, len(clean))
+    return written
+
+
+# --------------------------------------------------------------------------- dataset
+
+class ParquetSequence(lgb.Sequence):
+    """Rows [start, stop) of a meter Parquet file, decoded one row group at a time."""
+
+    # LightGBM reads sequences one after the other, so a single decoded row group
+    # shared by all instances bounds memory to one chunk whatever the fleet size
+    _cached: Tuple[Any, Optional[np.ndarray]] = (None, None)
+
+    def __init__(self, path: str, columns: List[str], meter_code: int, start: int = 0, stop: Optional[int] = None):
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self.columns = columns
+        self.meter_code = meter_code
+        meta = pq.read_metadata(path)
+        self._bounds = np.cumsum([0] + [meta.row_group(i).num_rows for i in range(meta.num_row_groups)])
+        self.start = start
+        self.stop = int(self._bounds[-1]) if stop is None else stop
+        self.batch_size = int(max(1, np.diff(self._bounds).max(initial=1)))
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def _group(self, i: int) -> np.ndarray:
+        key = (self.path, i, self.meter_code, tuple(self.columns))
+        if ParquetSequence._cached[0] != key:
+            import pyarrow.parquet as pq
+
+            # opened per row group so thousands of meters never hold thousands of file handles
+            with pq.ParquetFile(self.path) as f:
+                table = f.read_row_group(i, columns=self.columns)
+            block = np.empty((table.num_rows, len(self.columns) + 1), dtype=np.float32)
+            for j, col in enumerate(table.columns):
+                block[:, j] = col.to_numpy()
+            block[:, -1] = self.meter_code
+            ParquetSequence._cached = (key, block)
+        return ParquetSequence._cached[1]
+
+    @classmethod
+    def release(cls) -> None:
+        cls._cached = (None, None)
+
+    def _rows(self, lo: int, hi: int) -> np.ndarray:
+        parts = []
+        while lo < hi:
+            g = int(np.searchsorted(self._bounds, lo, side="right") - 1)
+            end = min(hi, int(self._bounds[g + 1]))
+            parts.append(self._group(g)[lo - self._bounds[g]:end - self._bounds[g]])
+            lo = end
+        return parts[0] if len(parts) == 1 else np.vstack(parts)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, np.integer)):
+            pos = self.start + int(idx)
+            # sampled rows (bin boundaries) must be float64; batches are pushed as float32
+            return self._rows(pos, pos + 1)[0].astype(np.float64)
+        if isinstance(idx, slice):
+            lo, hi, _ = idx.indices(len(self))
+            return self._rows(self.start + lo, self.start + hi)
+        if isinstance(idx, list):
+            return np.array([self[i] for i in idx])
+        raise TypeError(f"Sequence index must be integer, slice or list, got {type(idx).__name__}")
+
+    def labels(self, target_col: str) -> np.ndarray:
+        import pyarrow.parquet as pq
+
+        col = pq.read_table(self.path, columns=[target_col]).column(0).to_numpy()
+        return col[self.start:self.stop].astype(np.float32)
+
+
+def fleet_files(features_dir: str) -> Dict[str, str]:
+    """meter_id -> feature file, sorted so meter codes are stable across runs."""
+    files = sorted(glob.glob(os.path.join(features_dir, "*.parquet")))
+    if not files:
+        raise FileNotFoundError(f"No Parquet feature files found in {features_dir}")
+    return {Path(f).stem: f for f in files}
+
+
+def feature_columns(path: str, target_col: str) -> List[str]:
+    import pyarrow.parquet as pq
+
+    names = pq.read_schema(path).names
+    return [c for c in names if c != target_col and not c.startswith("__") and c != "datetime"]
+
+
+def split_sequences(meters: Dict[str, str], columns: List[str], valid_rows: int,
+                    ) -> Tuple[List[ParquetSequence], List[ParquetSequence]]:
+    """Per meter: all but the last `valid_rows` rows train, the tail validates."""
+    train, valid = [], []
+    for code, (meter_id, path) in enumerate(meters.items()):
+        full = ParquetSequence(path, columns, code)
+        cut = len(full) - valid_rows
+        if cut <= valid_rows:  # too short to hold out a tail: train on all of it
+            train.append(full)
+            continue
+        train.append(ParquetSequence(path, columns, code, 0, cut))
+        valid.append(ParquetSequence(path, columns, code, cut))
+    return train, valid
+
+
+def fleet_fingerprint(meters: Dict[str, str], cache: MatrixCache) -> Dict[str, str]:
+    """Per-meter content fingerprints, by the same rule as every other matrix cache key."""
+    return {meter_id: cache.fingerprint(path) for meter_id, path in meters.items()}
+
+
+def build_dataset(seqs: List[ParquetSequence], target_col: str, params: Dict[str, Any],
+                  reference: Optional[lgb.Dataset] = None) -> lgb.Dataset:
+    """Bin `seqs` into a LightGBM Dataset (raw rows are freed after construction)."""
+    names = seqs[0].columns + [METER_FEATURE]
+    label = np.concatenate([s.labels(target_col) for s in seqs])
+    ds = lgb.Dataset(seqs, label=label, feature_name=names, categorical_feature=[METER_FEATURE],
+                     params=params, reference=reference, free_raw_data=True).construct()
+    ParquetSequence.release()
+    return ds
+
+
+def fleet_datasets(meters: Dict[str, str], columns: List[str], target_col: str, params: Dict[str, Any],
+                   valid_rows: int, cache: Optional[MatrixCache] = None
+                   ) -> Tuple[lgb.Dataset, Optional[lgb.Dataset], bool]:
+    """(train, valid, reused) datasets; binaries are cached on the data/binning fingerprint."""
+    train_seqs, valid_seqs = split_sequences(meters, columns, valid_rows)
+    cache = cache or MatrixCache("", enabled=False)
+    spec = {"data": fleet_fingerprint(meters, cache), "columns": columns, "valid_rows": valid_rows,
+            "params": {k: params.get(k) for k in LGB_DATASET_PARAMS}}
+    dtrain, reused = cache.lgb_dataset(cache.key("global_lgbm.train", spec),
+                                       lambda: build_dataset(train_seqs, target_col, params), params)
+    dvalid = None
+    if valid_seqs:
+        dvalid, hit = cache.lgb_dataset(cache.key("global_lgbm.valid", spec),
+                                        lambda: build_dataset(valid_seqs, target_col, params, reference=dtrain),
+                                        params, reference=dtrain)
+        reused = reused and hit
+    return dtrain, dvalid, reused
+
+
+def predict_fleet(model: lgb.Booster, seqs: Seq[ParquetSequence], target_col: str,
+                  num_threads: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Stream predictions over `seqs` batch by batch; returns (y_true, y_pred)."""
+    y_true, y_pred = [], []
+    for seq in seqs:
+        y_true.append(seq.labels(target_col))
+        for lo in range(0, len(seq), seq.batch_size):
+            y_pred.append(model.predict(seq[lo:lo + seq.batch_size], num_threads=num_threads))
+    ParquetSequence.release()
+    if not y_true:
+        return np.empty(0), np.empty(0)
+    return np.concatenate(y_true), np.concatenate(y_pred)
+
+
+# --------------------------------------------------------------------------- train
+
+def train_global(cfg: Dict[str, Any], exp: Dict[str, Any], tracker=None, prof: Optional[StageProfiler] = None
+                 ) -> Dict[str, float]:
+    conf = exp["models"].get("global_lightgbm", {})
+    p = cfg["paths"]
+    tracker = tracker or get_tracker(cfg)
+    prof = prof or StageProfiler("global_lgbm", cfg)
+    target_col = cfg["training"]["target_col"]
+    periods_per_day = int(pd.Timedelta("1D") / pd.Timedelta(cfg["data"]["resample_freq"]))
+    valid_rows = cfg["training"].get("test_size_days", 30) * periods_per_day
+    params = train_params(conf.get("params", {}))
+    num_rounds = int(params.pop("n_estimators", 100))
+
+    meters = fleet_files(p["fleet_features_dir"])
+    columns = feature_columns(next(iter(meters.values())), target_col)
+    with tracker.start_run("global_lightgbm", tags=tracker.run_tags({
+        "model": "global_lightgbm",
+        "description": "Fleet-wide gradient boosting with meter id categorical, out-of-core dataset",
+        "meters": len(meters),
+    })):
+        with prof.stage("global_lgbm_dataset", tracker):
+            dtrain, dvalid, reused = fleet_datasets(meters, columns, target_col, params, valid_rows,
+                                                    from_config(cfg))
+        with prof.stage("global_lgbm_train", tracker):
+            model = lgb.train(params, dtrain, num_boost_round=num_rounds,
+                              valid_sets=[dvalid] if dvalid is not None else None,
+                              valid_names=["valid"] if dvalid is not None else None)
+        with prof.stage("global_lgbm_evaluate", tracker):
+            _, valid_seqs = split_sequences(meters, columns, valid_rows)
+            y_true, y_pred = predict_fleet(model, valid_seqs, target_col, params["num_threads"])
+            mm = metrics(y_true, y_pred) if len(y_true) else {}
+        tracker.log_params({**params, "n_estimators": num_rounds, "meters": len(meters)})
+        tracker.log_metrics({**mm, "train_rows": dtrain.num_data(), "dataset_reused": int(reused)})
+        model_path = os.path.join(p["models_dir"], MODEL_FILE)
+        model.save_model(model_path)
+        with open(os.path.join(p["models_dir"], METERS_FILE), "w") as f:
+            json.dump({"feature": METER_FEATURE, "codes": {m: i for i, m in enumerate(meters)}}, f, indent=2)
+        tracker.log_artifact(model_path, artifact_path="models")
+    peak = max(prof.stages[s]["peak_rss_mb"] for s in ("global_lgbm_dataset", "global_lgbm_train")
+               if s in prof.stages) if prof.enabled else None
+    logger.info("Global LightGBM: %s meters, %s train rows, metrics %s, peak RSS %s MB",
+                len(meters), dtrain.num_data(), mm, peak)
+    return mm
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Fleet-wide LightGBM (out-of-core)")
+    ap.add_argument("command", choices=["prepare", "train"])
+    ap.add_argument("--raw-dir", help="one CSV per meter (overrides paths.fleet_raw_dir)")
+    args = ap.parse_args(argv)
+    cfg, exp = load_configs()
+    if args.raw_dir:
+        cfg["paths"]["fleet_raw_dir"] = args.raw_dir
+    os.makedirs(cfg["paths"]["models_dir"], exist_ok=True)
+    conf = exp["models"].get("global_lightgbm", {})
+    prof = StageProfiler("global_lgbm", cfg)
+    if args.command == "prepare":
+        with prof.stage("prepare"):
+            prepare_fleet(cfg, int(conf.get("rows_per_chunk", 65536)))
+    else:
+        tracker = get_tracker(cfg)
+        train_global(cfg, exp, tracker, prof)
+        tracker.wait()
+    prof.save()
+
+
+if __name__ == "__main__":
+    main()
@@ -22,7 +22,6 @@ import os
 
 import joblib
 import lightgbm as lgb
-import mlflow
 import numpy as np
 import pandas as pd
 import tensorflow as tf
@@ -31,8 +30,11 @@ from tensorflow.keras import callbacks
 
 from models.architecture import (create_lstm_model, create_sequences,
                                  time_train_test_split, train_sarimax)
+from utils.intervals import LEVELS, persistence_residuals, save_table
+from utils.matrix_cache import LGB_DATASET_PARAMS, from_config
 from utils.metrics import metrics
-from utils.mlflow_utils import init_mlflow, with_run_tags
+from utils.mlflow_utils import get_tracker
+from utils.profiling import StageProfiler
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("train_model")
@@ -46,6 +48,42 @@ def load_configs():
     return cfg, exp
 
 
+def load_split(cache, key, features_file, target_col, test_days, freq):
+    """(X_train, y_train, X_test, y_test), memory-mapped from the matrix cache when already prepared."""
+    cached = cache.get_arrays(key)
+    if cached is None:
+        df = pd.read_csv(features_file, index_col=0, parse_dates=True)
+        train_df, test_df = time_train_test_split(df, test_days=test_days, freq=freq)
+        numeric = len(df.select_dtypes(include="number").columns) == len(df.columns)
+        if not cache.enabled or not numeric or not isinstance(df.index, pd.DatetimeIndex):
+            return (train_df.drop(columns=[target_col]), train_df[target_col],
+                    test_df.drop(columns=[target_col]), test_df[target_col])
+        features = [c for c in df.columns if c != target_col]
+        meta = {"features": features, "target": target_col, "index_name": df.index.name,
+                "tz": str(df.index.tz) if df.index.tz is not None else None}
+        arrays = {}
+        for part, frame in (("train", train_df), ("test", test_df)):
+            arrays[f"X_{part}"] = frame[features].to_numpy(dtype=np.float64)
+            arrays[f"y_{part}"] = frame[target_col].to_numpy(dtype=np.float64)
+            arrays[f"index_{part}"] = frame.index.asi8
+        cached = (cache.put_arrays(key, arrays, meta), meta)
+    arrays, meta = cached
+    out = []
+    for part in ("train", "test"):
+        index = pd.DatetimeIndex(np.asarray(arrays[f"index_{part}"]).view("datetime64[ns]"), name=meta["index_name"])
+        if meta["tz"]:
+            index = index.tz_localize("UTC").tz_convert(meta["tz"])
+        out.append(pd.DataFrame(arrays[f"X_{part}"], index=index, columns=meta["features"]))
+        out.append(pd.Series(arrays[f"y_{part}"], index=index, name=meta["target"]))
+    return tuple(out)
+
+
+def calibration_split(X, y, periods):
+    """(X_fit, y_fit, X_cal, y_cal): the last `periods` rows of train are held out of fitting
+    for conformal calibration, so the test split only ever measures the models."""
+    periods = max(1, min(int(periods), len(y) // 2))
+    return X.iloc[:-periods], y.iloc[:-periods], X.iloc[-periods:], y.iloc[-periods:]
+
 
 def run():
     cfg, exp = load_configs()
@@ -64,54 +102,66 @@ def run():
     p = cfg["paths"]
     features_file = p["features_file"]
     os.makedirs(p["models_dir"], exist_ok=True)
-    # Initialize MLflow with professional experiment-level tags
-    init_mlflow(cfg)
+    # Buffered MLflow tracking (experiment initialized lazily, no-op if disabled)
+    tracker = get_tracker(cfg)
+    # wall/CPU/peak RSS per stage -> reports/profiles/train_model.json + each model's run
+    prof = StageProfiler("train_model", cfg)
+    # prepared matrices keyed on the features file content + split/window/binning settings
+    cache = from_config(cfg)
 
-    df = pd.read_csv(features_file, index_col=0, parse_dates=True)
     target_col = cfg["training"]["target_col"]
     freq = cfg["data"]["resample_freq"]
-
-    # split
     test_days = cfg["training"].get("test_size_days", 30)
-    train_df, test_df = time_train_test_split(df, test_days=test_days, freq=freq)
-    X_train = train_df.drop(columns=[target_col])
-    y_train = train_df[target_col]
-    X_test = test_df.drop(columns=[target_col])
-    y_test = test_df[target_col]
+    with prof.stage("load_split"):
+        split_key = cache.key("split", cache.fingerprint(features_file), target_col, test_days, freq)
+        X_train, y_train, X_test, y_test = load_split(cache, split_key, features_file, target_col, test_days, freq)
 
     results = {}
+    # residuals per model and horizon on a calibration slice (end of train, not fitted on,
+    # not the test split) -> split-conformal intervals (utils/intervals.py)
+    iv_conf = cfg["training"].get("intervals", {})
+    periods_per_day = int(pd.Timedelta("1D") / pd.Timedelta(freq))
+    cal_periods = int(iv_conf.get("calibration_days", 14)) * periods_per_day
+    X_fit, y_fit, X_cal, y_cal = calibration_split(X_train, y_train, cal_periods)
+    cal_periods = len(y_cal)
+    calibration = {}
 
     # PERSISTENCE baseline
     if exp["models"].get("persistence", {}).get("enabled", True):
-        with mlflow.start_run(run_name="persistence"):
-            mlflow.set_tags(with_run_tags(cfg, {"model": "persistence", "description": "Naive previous-value baseline"}))
+        with tracker.start_run("persistence", tags=tracker.run_tags({"model": "persistence", "description": "Naive previous-value baseline"})), \
+                prof.stage("persistence", tracker):
             preds = y_test.shift(1).fillna(method="bfill")  # naive
             mm = metrics(y_test, preds)
-            mlflow.log_metrics(mm)
+            tracker.log_metrics(mm)
             results["persistence"] = mm
+            # also serves /forecast, whose naive forecast repeats the last value over the horizon
+            calibration["persistence"] = persistence_residuals(y_cal.values, int(iv_conf.get("max_horizon", 672)))
             logger.info("Persistence metrics: %s", mm)
 
     # SARIMAX
     if exp["models"].get("sarimax", {}).get("enabled", True):
         sar_conf = exp["models"]["sarimax"]
-        with mlflow.start_run(run_name="sarimax"):
-            mlflow.set_tags(with_run_tags(cfg, {
-                "model": "sarimax",
-                "description": "Seasonal ARIMA with exogenous (if any)",
-                "order": sar_conf.get("order"),
-                "seasonal_order": sar_conf.get("seasonal_order"),
-            }))
+        with tracker.start_run("sarimax", tags=tracker.run_tags({
+            "model": "sarimax",
+            "description": "Seasonal ARIMA with exogenous (if any)",
+            "order": sar_conf.get("order"),
+            "seasonal_order": sar_conf.get("seasonal_order"),
+        })), prof.stage("sarimax", tracker):
             try:
-                res = train_sarimax(y_train, None, sar_conf)
+                res = train_sarimax(y_fit, None, sar_conf)
+                # roll the state over the calibration slice, parameters kept from the fit span:
+                # its one-step-ahead residuals calibrate the intervals, the test forecast starts after it
+                res = res.append(y_cal.values)
+                calibration["sarimax"] = [y_cal.values - np.asarray(res.fittedvalues[-cal_periods:])]
                 steps = len(y_test)
                 pred = res.get_forecast(steps=steps).predicted_mean
                 mm = metrics(y_test, pred)
-                mlflow.log_params({"order": sar_conf.get("order"), "seasonal_order": sar_conf.get("seasonal_order")})
-                mlflow.log_metrics(mm)
+                tracker.log_params({"order": sar_conf.get("order"), "seasonal_order": sar_conf.get("seasonal_order")})
+                tracker.log_metrics(mm)
                 # save model via joblib (statsmodels objects serializable)
                 model_path = os.path.join(p["models_dir"], "sarimax.pkl")
                 joblib.dump(res, model_path)
-                mlflow.log_artifact(model_path, artifact_path="models")
+                tracker.log_artifact(model_path, artifact_path="models")
                 results["sarimax"] = mm
                 logger.info("SARIMAX metrics: %s", mm)
             except Exception as e:
@@ -122,71 +172,98 @@ def run():
         lgb_conf = exp["models"]["lightgbm"]["params"]
         # choose first combination for simplicity here; for real HPO iterate grid
         param = {k: v[0] if isinstance(v, list) else v for k, v in exp["models"]["lightgbm"]["params"].items()}
-        with mlflow.start_run(run_name="lightgbm"):
-            mlflow.set_tags(with_run_tags(cfg, {"model": "lightgbm", "description": "Gradient boosting regressor on lag/time features"}))
-            dtrain = lgb.Dataset(X_train, label=y_train)
+        with tracker.start_run("lightgbm", tags=tracker.run_tags({"model": "lightgbm", "description": "Gradient boosting regressor on lag/time features"})), \
+                prof.stage("lightgbm", tracker):
+            ds_params = {k: param[k] for k in LGB_DATASET_PARAMS if k in param}
+            dtrain, _ = cache.lgb_dataset(cache.key("lightgbm", split_key, cal_periods, ds_params),
+                                          lambda: lgb.Dataset(X_fit, label=y_fit, params=ds_params), ds_params)
             model = lgb.train(param, dtrain, num_boost_round=param.get("n_estimators", 100))
             pred = model.predict(X_test)
             mm = metrics(y_test, pred)
-            mlflow.log_params(param)
-            mlflow.log_metrics(mm)
+            tracker.log_params(param)
+            tracker.log_metrics(mm)
             model_path = os.path.join(p["models_dir"], "lightgbm.txt")
             model.save_model(model_path)
-            mlflow.log_artifact(model_path, artifact_path="models")
+            tracker.log_artifact(model_path, artifact_path="models")
             results["lightgbm"] = mm
+            calibration["lightgbm"] = [y_cal.values - model.predict(X_cal)]
             logger.info("LightGBM metrics: %s", mm)
 
+    # Global LightGBM over the whole fleet (out-of-core, see models/global_lgbm.py)
+    if exp["models"].get("global_lightgbm", {}).get("enabled", False):
+        from models.global_lgbm import train_global
+        try:
+            results["global_lightgbm"] = train_global(cfg, exp, tracker, prof)
+        except FileNotFoundError as e:
+            logger.error("Global LightGBM skipped: %s (run `python -m src.models.global_lgbm prepare`)", e)
+
     # LSTM (using scaled features; sequences)
     if exp["models"].get("lstm", {}).get("enabled", True):
         lstm_conf = exp["models"]["lstm"]["params"]
         # use first params
         params = {k: v[0] if isinstance(v, list) else v for k, v in lstm_conf.items()}
         lookback = 96  # e.g., use last day as context; tweak in config
-        # prepare numpy arrays
-        Xt = X_train.values
-        yt = y_train.values
-        Xs_train, ys_train = create_sequences(Xt, yt, lookback=lookback)
-        Xtst = X_test.values
-        ys = y_test.values
-        # for test, create sequences from combined tail of train+test to ensure continuity
-        combined = np.vstack([Xt, Xtst])
-        combined_y = np.concatenate([yt, ys])
-        Xs_all, ys_all = create_sequences(combined, combined_y, lookback=lookback)
+        with prof.stage("lstm_sequences"):
+            ys = y_test.values
+            windows_key = cache.key("lstm_windows", split_key, lookback)
+            cached = cache.get_arrays(windows_key)
+            if cached is None:
+                # for test, create sequences from combined tail of train+test to ensure continuity
+                combined = np.vstack([X_train.values, X_test.values])
+                combined_y = np.concatenate([y_train.values, ys])
+                Xs_all, ys_all = create_sequences(combined, combined_y, lookback=lookback)
+                windows = cache.put_arrays(windows_key, {"X": Xs_all, "y": ys_all})
+            else:
+                windows = cached[0]
+            Xs_all, ys_all = windows["X"], windows["y"]
         # split last len(test) sequences as test
         n_test = len(ys)
         Xs_test = Xs_all[-n_test:]
         ys_test = ys_all[-n_test:]
-        Xs_train2 = Xs_all[:-n_test]
-        ys_train2 = ys_all[:-n_test]
+        # last train windows: calibration slice, kept out of fitting
+        Xs_train2 = Xs_all[:-n_test - cal_periods]
+        ys_train2 = ys_all[:-n_test - cal_periods]
+        Xs_cal = Xs_all[-n_test - cal_periods:-n_test]
+        ys_cal = ys_all[-n_test - cal_periods:-n_test]
 
         tf.keras.backend.clear_session()
         model = create_lstm_model(input_shape=(Xs_train2.shape[1], Xs_train2.shape[2]),
                                   units=int(params.get("units", 64)),
                                   lr=float(params.get("lr", 0.001)))
         es = callbacks.EarlyStopping(monitor="val_loss", patience=5, restore_best_weights=True)
-        with mlflow.start_run(run_name="lstm"):
-            mlflow.set_tags(with_run_tags(cfg, {"model": "lstm", "description": "Univariate LSTM on sliding windows"}))
+        with tracker.start_run("lstm", tags=tracker.run_tags({"model": "lstm", "description": "Univariate LSTM on sliding windows"})), \
+                prof.stage("lstm", tracker):
+            tracker.log_metrics(prof.metrics("lstm_sequences"))
             history = model.fit(Xs_train2, ys_train2, validation_split=0.1,
                                 epochs=int(params.get("epochs", 20)),
                                 batch_size=int(params.get("batch_size", 64)),
                                 callbacks=[es], verbose=0)
             pred = model.predict(Xs_test).ravel()
             mm = metrics(ys_test, pred)
-            mlflow.log_params(params)
-            mlflow.log_metrics(mm)
+            tracker.log_params(params)
+            tracker.log_metrics(mm)
             # save model
             model_path = os.path.join(p["models_dir"], "lstm_model.h5")
             model.save(model_path)
-            mlflow.log_artifact(model_path, artifact_path="models")
+            tracker.log_artifact(model_path, artifact_path="models")
             results["lstm"] = mm
+            calibration["lstm"] = [ys_cal - model.predict(Xs_cal).ravel()]
             logger.info("LSTM metrics: %s", mm)
 
+    intervals_path = save_table(p["models_dir"], calibration, freq, iv_conf.get("levels", LEVELS))
+    if intervals_path:
+        logger.info("Saved conformal interval table for %s to %s", sorted(calibration), intervals_path)
+
     # Save summary
     report_path = os.path.join(cfg["paths"]["reports_dir"], "metrics_summary.json")
     os.makedirs(cfg["paths"]["reports_dir"], exist_ok=True)
     with open(report_path, "w") as f:
         json.dump(results, f, indent=2)
     logger.info(f"Saved summary metrics to {report_path}")
+    logger.info("Training matrix cache: %s", cache.stats)
+    prof.save()
+    # artifact uploads overlap with training; make sure they are done before returning
+    tracker.wait()
 
 if __name__ == "__main__":
     run()
\ No newline at end of file
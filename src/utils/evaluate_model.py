@@ -1,4 +1,12 @@
 # src/evaluate_model.py
+import sys
+from pathlib import Path
+
+# Make `utils` importable when this file is executed directly (python src/...)
+SRC_DIR = Path(__file__).resolve().parents[1]
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
 import json
 import logging
 import os
@@ -7,6 +15,8 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import yaml
 
+from utils.profiling import StageProfiler
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("evaluate_model")
 
@@ -17,22 +27,25 @@ def load_configs():
 
 def main():
     cfg = load_configs()
+    prof = StageProfiler("evaluate_model", cfg)
     rep = cfg["paths"]["reports_dir"]
     os.makedirs(rep, exist_ok=True)
     summary_file = os.path.join(rep, "metrics_summary.json")
     if not os.path.exists(summary_file):
         logger.error("Metrics summary not found. Run training first.")
         return
-    with open(summary_file) as f:
-        metrics = json.load(f)
-    # Print summary
-    print("Model comparison:")
-    for m, s in metrics.items():
-        print(f"- {m}: {s}")
-    # save a simple CSV
-    df = pd.DataFrame(metrics).T
-    df.to_csv(os.path.join(rep, "metrics_summary.csv"))
+    with prof.stage("evaluate"):
+        with open(summary_file) as f:
+            metrics = json.load(f)
+        # Print summary
+        print("Model comparison:")
+        for m, s in metrics.items():
+            print(f"- {m}: {s}")
+        # save a simple CSV
+        df = pd.DataFrame(metrics).T
+        df.to_csv(os.path.join(rep, "metrics_summary.csv"))
     logger.info("Saved metrics CSV")
+    prof.save()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
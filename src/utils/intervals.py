@@ -0,0 +1,162 @@
+"""Prediction intervals
+======================
+Split-conformal intervals computed at training time, applied at serving time by lookup.
+
+Training (models/train_model.py) holds the last `training.intervals.calibration_days`
+of the train split out of fitting and calibrates on them (the test split is
+only used for the reported metrics): for each model and horizon h it stores
+quantiles of the absolute residuals |y - y_hat| at a grid of levels (finite-sample corrected: the ceil((n+1)*level)/n
+empirical quantile), in `<models_dir>/intervals.json`.
+
+Serving (api/serve_api.py) never refits or samples:
+- `bounds(model, pred, levels)` -> y_hat -/+ q_h(level) per forecast step,
+- `prob_above(model, pred, threshold)` -> P(y >= threshold) per step, read from
+  the |residual| CDF interpolated between the stored levels (errors assumed
+  symmetric around the forecast).
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+from pandas.tseries.frequencies import to_offset
+
+INTERVALS_FILE = "intervals.json"
+LEVELS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99)
+
+# serving model names that share a training-time table
+ALIASES = {"naive-persistence": "persistence"}
+
+# deprecated pandas offset aliases (FutureWarning in pandas 2.2, rejected by pandas 3)
+_FREQ_ALIASES = {"T": "min", "S": "s", "L": "ms", "U": "us", "N": "ns", "H": "h"}
+
+
+def normalize_freq(freq: str) -> str:
+    """Canonical offset alias ("15T" -> "15min") without going through the deprecated spelling."""
+    m = re.fullmatch(r"\s*(-?\d*)\s*([A-Za-z]+)\s*", freq)
+    if m and m.group(2) in _FREQ_ALIASES:
+        freq = m.group(1) + _FREQ_ALIASES[m.group(2)]
+    return to_offset(freq).freqstr
+
+
+def conformal_quantiles(abs_residuals: np.ndarray, levels: Sequence[float] = LEVELS) -> np.ndarray:
+    """Finite-sample split-conformal quantiles of |residuals| at each level."""
+    r = np.asarray(abs_residuals, dtype=np.float64)
+    r = r[np.isfinite(r)]
+    n = len(r)
+    if n == 0:
+        raise ValueError("no residuals to calibrate on")
+    probs = np.minimum(1.0, np.ceil((n + 1) * np.asarray(levels)) / n)
+    return np.quantile(r, probs, method="higher")
+
+
+def horizon_table(residuals: Iterable[np.ndarray], levels: Sequence[float] = LEVELS) -> np.ndarray:
+    """(levels x horizons) table from per-horizon residual arrays (horizon 1 first)."""
+    cols = [conformal_quantiles(np.abs(r), levels) for r in residuals]
+    # wider horizons never get narrower intervals than nearer ones
+    return np.maximum.accumulate(np.column_stack(cols), axis=1)
+
+
+def persistence_residuals(y: np.ndarray, max_horizon: int, min_samples: int = 30) -> list[np.ndarray]:
+    """Residuals of the naive forecast y_hat(t+h) = y(t) for h = 1..max_horizon."""
+    y = np.asarray(y, dtype=np.float64)
+    max_horizon = min(max_horizon, len(y) - min_samples)
+    return [y[h:] - y[:-h] for h in range(1, max_horizon + 1)]
+
+
+class IntervalTable:
+    def __init__(self, levels: Sequence[float], freq: Optional[str], models: Dict[str, Dict]):
+        self.levels = np.asarray(levels, dtype=np.float64)
+        self.freq = normalize_freq(freq) if freq else None
+        self.n = {m: int(v.get("n", 0)) for m, v in models.items()}
+        self.q = {m: np.asarray(v["quantiles"], dtype=np.float64) for m, v in models.items()}
+        # |residual| CDF knots per model: (0, 0) then (q_level, level)
+        self._knots = {m: np.vstack([np.zeros((1, q.shape[1])), q]) for m, q in self.q.items()}
+        self._cdf = np.concatenate([[0.0], self.levels])
+
+    @classmethod
+    def load(cls, path: str) -> "IntervalTable":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["levels"], data.get("freq"), data["models"])
+
+    def to_dict(self) -> Dict:
+        return {
+            "levels": self.levels.tolist(),
+            "freq": self.freq,
+            "models": {m: {"n": self.n.get(m, 0), "quantiles": q.tolist()} for m, q in self.q.items()},
+        }
+
+    def save(self, path: str) -> str:
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+        return path
+
+    def has(self, model: str) -> bool:
+        return ALIASES.get(model, model) in self.q
+
+    def steps(self, model: str, horizon: int, freq: Optional[str] = None) -> np.ndarray:
+        """Table column for each of the `horizon` steps of a forecast spaced by `freq`."""
+        width = self.q[ALIASES.get(model, model)].shape[1]
+        ratio = 1.0
+        if freq and self.freq:
+            try:
+                ratio = to_offset(freq).nanos / to_offset(self.freq).nanos
+            except ValueError:  # calendar offsets (months...): use the widest calibrated horizon
+                return np.full(horizon, width - 1)
+        cols = np.ceil(np.arange(1, horizon + 1) * ratio).astype(np.int64) - 1
+        return np.clip(cols, 0, width - 1)
+
+    def bounds(self, model: str, pred, levels: Sequence[float], freq: Optional[str] = None,
+               floor: Optional[float] = None) -> Dict[str, Dict[str, list]]:
+        """{level: {"lower": [...], "upper": [...]}} around `pred` for the stored levels requested."""
+        pred = np.asarray(pred, dtype=np.float64)
+        q = self.q[ALIASES.get(model, model)][:, self.steps(model, len(pred), freq)]
+        out = {}
+        for level in levels:
+            rows = np.flatnonzero(np.isclose(self.levels, level))
+            if len(rows):
+                half = q[rows[0]]
+                lower = pred - half if floor is None else np.maximum(pred - half, floor)
+                out[f"{level:g}"] = {"lower": lower.tolist(), "upper": (pred + half).tolist()}
+        return out
+
+    def abs_error_cdf(self, model: str, distance, freq: Optional[str] = None) -> np.ndarray:
+        """P(|y - y_hat| <= distance) per step (piecewise linear between stored levels)."""
+        d = np.abs(np.asarray(distance, dtype=np.float64))
+        knots = self._knots[ALIASES.get(model, model)][:, self.steps(model, len(d), freq)]
+        k = (knots <= d).sum(axis=0)  # knot segment each distance falls in (>= 1)
+        inside = k < len(self._cdf)
+        cdf = np.ones_like(d)
+        j = k[inside]
+        cols = np.flatnonzero(inside)
+        x0, x1 = knots[j - 1, cols], knots[j, cols]
+        y0, y1 = self._cdf[j - 1], self._cdf[j]
+        frac = np.divide(d[inside] - x0, x1 - x0, out=np.ones_like(x0), where=x1 > x0)
+        cdf[inside] = y0 + frac * (y1 - y0)
+        return cdf
+
+    def prob_above(self, model: str, pred, threshold: float, freq: Optional[str] = None) -> np.ndarray:
+        """P(y >= threshold) per step given point forecasts `pred`."""
+        pred = np.asarray(pred, dtype=np.float64)
+        tail = (1.0 - self.abs_error_cdf(model, pred - threshold, freq)) / 2.0
+        return np.where(pred >= threshold, 1.0 - tail, tail)
+
+
+def save_table(models_dir: str, residuals: Dict[str, Iterable[np.ndarray]], freq: Optional[str],
+               levels: Sequence[float] = LEVELS) -> Optional[str]:
+    """Calibrate every model of `residuals` ({model: per-horizon residual arrays}) and save."""
+    models = {}
+    for name, per_h in residuals.items():
+        per_h = [np.asarray(r, dtype=np.float64) for r in per_h]
+        per_h = [r[np.isfinite(r)] for r in per_h]
+        if per_h and all(len(r) for r in per_h):
+            models[name] = {"n": len(per_h[0]), "quantiles": horizon_table(per_h, levels)}
+    if not models:
+        return None
+    return IntervalTable(levels, freq, models).save(os.path.join(models_dir, INTERVALS_FILE))
@@ -0,0 +1,248 @@
+"""Training Matrix Cache
+=====================
+Local content-addressed cache of prepared training inputs (train/test splits,
+LSTM windows, LightGBM binary datasets), so repeated experiments skip parsing
+and windowing.
+
+Keys hash a data fingerprint (blake2b of the input file content, memoized per
+path/mtime/size in `fingerprints.json`) with the config fields the matrices
+depend on. Each entry is a directory `<dir>/<key>/`:
+- numpy arrays as `.npy`, returned memory-mapped (read-only, shared page cache),
+- opaque files (e.g. LightGBM `.bin`) under a caller-chosen name,
+- `meta.json` with JSON metadata; its mtime is the LRU clock.
+Entries are written to a temporary directory and renamed into place, and the
+least recently used ones are evicted once the cache exceeds `max_bytes`.
+
+Functions / classes
+-------------------
+- file_fingerprint(path, memo_dir=None) -> str
+- MatrixCache(root, max_bytes, enabled=True)
+- from_config(cfg) -> MatrixCache
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("matrix_cache")
+
+# bump when the layout of cached entries changes
+FORMAT_VERSION = 1
+
+# LightGBM parameters that change a binned Dataset; they belong in its cache key
+# (min_data_in_leaf too: with feature_pre_filter it drops features at construction)
+LGB_DATASET_PARAMS = ("max_bin", "min_data_in_bin", "bin_construct_sample_cnt", "min_data_in_leaf",
+                      "max_cat_threshold", "min_data_per_group", "cat_smooth", "cat_l2",
+                      "feature_pre_filter", "use_missing", "zero_as_missing", "categorical_feature")
+META_FILE = "meta.json"
+_FINGERPRINTS = "fingerprints.json"
+
+
+def _hash_file(path: str, chunk: int = 1 << 20) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_fingerprint(path: str, memo_dir: Optional[str] = None) -> str:
+    """Content hash of `path`; with `memo_dir`, rehashed only when mtime or size change."""
+    st = os.stat(path)
+    stamp = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+    memo, memo_path = {}, None
+    if memo_dir:
+        memo_path = os.path.join(memo_dir, _FINGERPRINTS)
+        try:
+            with open(memo_path) as f:
+                memo = json.load(f)
+        except (OSError, ValueError):
+            memo = {}
+        entry = memo.get(os.path.abspath(path))
+        if entry and entry.get("stamp") == stamp:
+            return entry["hash"]
+    digest = _hash_file(path)
+    if memo_path:
+        memo[os.path.abspath(path)] = {"stamp": stamp, "hash": digest}
+        tmp = memo_path + f".{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(memo, f)
+        os.replace(tmp, memo_path)
+    return digest
+
+
+class MatrixCache:
+    """Content-addressed store of memory-mapped arrays and files, LRU-evicted by total bytes."""
+
+    def __init__(self, root: str, max_bytes: int = 2 * 1024 ** 3, enabled: bool = True):
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self.enabled = enabled
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        if enabled:
+            os.makedirs(root, exist_ok=True)
+
+    def key(self, *parts: Any) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(json.dumps([FORMAT_VERSION, *parts], sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def fingerprint(self, path: str) -> str:
+        """Content fingerprint of an input file ("" when disabled: keys are not used then)."""
+        return file_fingerprint(path, self.root) if self.enabled else ""
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _touch(self, key: str) -> None:
+        try:
+            os.utime(os.path.join(self._entry(key), META_FILE))
+        except OSError:
+            pass
+
+    def contains(self, key: str) -> bool:
+        return self.enabled and os.path.exists(os.path.join(self._entry(key), META_FILE))
+
+    # ---------------------------------------------------------------- arrays
+
+    def _load(self, key: str) -> Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+        entry = self._entry(key)
+        try:
+            with open(os.path.join(entry, META_FILE)) as f:
+                meta = json.load(f)
+            arrays = {name: np.load(os.path.join(entry, f"{name}.npy"), mmap_mode="r")
+                      for name in meta.get("arrays", [])}
+        except (OSError, ValueError) as e:  # partially evicted / corrupted: treat as a miss
+            logger.warning("Dropping unreadable cache entry %s: %s", key, e)
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+        return arrays, meta.get("meta", {})
+
+    def get_arrays(self, key: str) -> Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+        """({name: read-only memmap}, meta) for a cached entry, or None."""
+        cached = self._load(key) if self.contains(key) else None
+        with self._lock:
+            self.stats["hits" if cached else "misses"] += 1
+        if cached:
+            self._touch(key)
+        return cached
+
+    def put_arrays(self, key: str, arrays: Dict[str, np.ndarray], meta: Optional[Dict[str, Any]] = None
+                   ) -> Dict[str, np.ndarray]:
+        """Store arrays under `key`; returns them memory-mapped from the cache (as given if disabled)."""
+        if not self.enabled:
+            return arrays
+        with self._write(key, {"arrays": sorted(arrays), "meta": meta or {}}) as tmp:
+            for name, arr in arrays.items():
+                np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(arr))
+        cached = self._load(key)
+        return cached[0] if cached else arrays
+
+    # ---------------------------------------------------------------- files
+
+    def file_path(self, key: str, name: str) -> Optional[str]:
+        """Path of a cached file, or None (counted as a miss)."""
+        path = os.path.join(self._entry(key), name)
+        hit = self.contains(key) and os.path.exists(path)
+        with self._lock:
+            self.stats["hits" if hit else "misses"] += 1
+        if hit:
+            self._touch(key)
+        return path if hit else None
+
+    @contextmanager
+    def put_file(self, key: str, name: str, meta: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """`with cache.put_file(key, "train.bin") as path:` write to `path`; published on exit.
+
+        Only meaningful when the cache is enabled; callers skip the write otherwise.
+        """
+        with self._write(key, {"files": [name], "meta": meta or {}}) as tmp:
+            yield os.path.join(tmp, name)
+
+    def lgb_dataset(self, key: str, build: Callable[[], Any], params: Optional[Dict[str, Any]] = None,
+                    reference: Any = None) -> Tuple[Any, bool]:
+        """(LightGBM Dataset, hit): loaded from the cached binary, else `build()`, constructed and saved."""
+        import lightgbm as lgb
+
+        path = self.file_path(key, "dataset.bin")
+        if path:
+            return lgb.Dataset(path, params=params, reference=reference).construct(), True
+        ds = build().construct()
+        if self.enabled:
+            with self.put_file(key, "dataset.bin") as tmp:
+                ds.save_binary(tmp)
+        return ds, False
+
+    # ---------------------------------------------------------------- internals
+
+    @contextmanager
+    def _write(self, key: str, meta: Dict[str, Any]) -> Iterator[str]:
+        tmp = tempfile.mkdtemp(prefix=f".{key}.", dir=self.root)
+        try:
+            yield tmp
+            with open(os.path.join(tmp, META_FILE), "w") as f:
+                json.dump({**meta, "created": time.time()}, f)
+            entry = self._entry(key)
+            shutil.rmtree(entry, ignore_errors=True)
+            try:
+                os.rename(tmp, entry)
+            except OSError:  # another process published the same key first
+                shutil.rmtree(tmp, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self._evict(keep=key)
+
+    def entries(self) -> Dict[str, Tuple[float, int]]:
+        """key -> (last use, size in bytes)."""
+        out = {}
+        for key in os.listdir(self.root) if os.path.isdir(self.root) else []:
+            entry = self._entry(key)
+            meta = os.path.join(entry, META_FILE)
+            if key.startswith(".") or not os.path.exists(meta):
+                continue
+            size = sum(e.stat().st_size for e in os.scandir(entry) if e.is_file())
+            out[key] = (os.path.getmtime(meta), size)
+        return out
+
+    def size(self) -> int:
+        return sum(size for _, size in self.entries().values())
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        entries = self.entries()
+        total = sum(size for _, size in entries.values())
+        for key, (_, size) in sorted(entries.items(), key=lambda kv: kv[1][0]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            total -= size
+            with self._lock:
+                self.stats["evictions"] += 1
+            logger.info("Evicted training cache entry %s (%.1f MB)", key, size / 1e6)
+
+    def clear(self) -> None:
+        if os.path.isdir(self.root):
+            shutil.rmtree(self.root)
+        if self.enabled:
+            os.makedirs(self.root, exist_ok=True)
+
+
+def from_config(cfg: Dict[str, Any]) -> MatrixCache:
+    """MatrixCache from the `matrix_cache` section (MATRIX_CACHE_DIR overrides the directory)."""
+    conf = cfg.get("matrix_cache", {})
+    enabled = bool(conf.get("enabled", True)) and os.getenv("MATRIX_CACHE_DISABLE", "0") not in {"1", "true", "True"}
+    return MatrixCache(os.getenv("MATRIX_CACHE_DIR", conf.get("dir", os.path.join(".cache", "matrices"))),
+                       max_bytes=int(conf.get("max_bytes", 2 * 1024 ** 3)), enabled=enabled)
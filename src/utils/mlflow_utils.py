@@ -6,23 +6,47 @@ Functions
 ---------
 - init_mlflow(cfg: dict) -> None
   Sets tracking URI, creates/sets experiment, and applies consistent experiment-level tags.
-- with_run_tags(tags: dict) -> dict
+- with_run_tags(cfg: dict, extra: dict, config_hash=None) -> dict
   Merge default run-level tags (git info, data fingerprint, target variable, etc.) with custom tags.
+  `Tracker.run_tags(extra)` does the same with the config hash computed once per tracker.
 - data_fingerprint(df) -> str
   Stable hash summarizing input data used for training/eval.
+- get_tracker(cfg) -> Tracker
+  Process-wide tracker per (tracking URI, experiment) that batches params/metrics/tags into `log_batch` calls,
+  uploads artifacts on a background thread and is flushed at exit. Tracking can
+  be turned off with `mlflow.enabled: false` or `MLFLOW_DISABLE=1`.
 """
 from __future__ import annotations
 
+import atexit
 import hashlib
 import json
+import logging
 import os
+import shutil
 import subprocess
-from typing import Any, Dict
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import mlflow
+from mlflow.entities import Metric, Param, RunTag
 
+logger = logging.getLogger("mlflow_utils")
 
-def _git(cmd: list[str]) -> str:
+# MLflow server-side limits for a single log_batch request
+MAX_BATCH_METRICS = 1000
+MAX_BATCH_PARAMS = 100
+MAX_BATCH_TAGS = 100
+
+
+@lru_cache(maxsize=None)
+def _git(cmd: Tuple[str, ...]) -> str:
+    # cached: the checkout does not change during a process lifetime
     try:
         out = subprocess.check_output(["git", *cmd], stderr=subprocess.DEVNULL).decode().strip()
         return out
@@ -35,6 +59,22 @@ def _hash_obj(obj: Any) -> str:
     return hashlib.sha256(s).hexdigest()[:16]
 
 
+def tracking_target(cfg: Dict[str, Any]) -> Tuple[str, str]:
+    """(tracking URI, experiment name) a config logs to."""
+    conf = cfg.get("mlflow", {})
+    return conf.get("tracking_uri", "file:./mlruns"), conf.get("experiment_name", "default")
+
+
+def tracking_enabled(cfg: Dict[str, Any]) -> bool:
+    if os.getenv("MLFLOW_DISABLE", "0") in {"1", "true", "True"}:
+        return False
+    return bool(cfg.get("mlflow", {}).get("enabled", True))
+
+
+# (tracking_uri, experiment, tags hash) already initialized in this process
+_INITIALIZED: set = set()
+
+
 def init_mlflow(cfg: Dict[str, Any]) -> None:
     """Initialize MLflow according to config and set experiment-level tags & description.
 
@@ -44,30 +84,39 @@ def init_mlflow(cfg: Dict[str, Any]) -> None:
       - mlflow.experiment_description (optionnel)
       - training.target_col
     """
-    tracking_uri = cfg.get("mlflow", {}).get("tracking_uri", "file:./mlruns")
-    exp_name = cfg.get("mlflow", {}).get("experiment_name", "default")
+    tracking_uri, exp_name = tracking_target(cfg)
     target = cfg.get("training", {}).get("target_col", "target")
     exp_desc = cfg.get("mlflow", {}).get(
         "experiment_description",
         "GreenPulse energy demand forecasting experiments"
     )
 
+    wanted = {
+        "project": "GreenPulse",
+        "target": target,
+        "environment": os.getenv("ENV", "dev"),
+        # Description visible dans l'UI MLflow via un tag standard
+        "description": exp_desc,
+        "mlflow.note.content": exp_desc,
+    }
     mlflow.set_tracking_uri(tracking_uri)
-    mlflow.set_experiment(exp_name)
+    key = (tracking_uri, exp_name, _hash_obj(wanted))
+    if key in _INITIALIZED:
+        return
+    exp = mlflow.set_experiment(exp_name)
 
-    # Set experiment tags (applies to current active experiment)
-    client = mlflow.tracking.MlflowClient()
-    exp = client.get_experiment_by_name(exp_name)
+    # Only write experiment tags that are missing or changed (one round trip each)
     if exp is not None:
-        client.set_experiment_tag(exp.experiment_id, "project", "GreenPulse")
-        client.set_experiment_tag(exp.experiment_id, "target", target)
-        client.set_experiment_tag(exp.experiment_id, "environment", os.getenv("ENV", "dev"))
-        # Description visible dans l'UI MLflow via un tag standard
-        client.set_experiment_tag(exp.experiment_id, "description", exp_desc)
-        client.set_experiment_tag(exp.experiment_id, "mlflow.note.content", exp_desc)
+        client = mlflow.tracking.MlflowClient()
+        current = exp.tags or {}
+        for k, v in wanted.items():
+            if current.get(k) != v:
+                client.set_experiment_tag(exp.experiment_id, k, v)
+    _INITIALIZED.add(key)
 
 
-def with_run_tags(cfg: Dict[str, Any], extra: Dict[str, Any] | None = None) -> Dict[str, str]:
+def with_run_tags(cfg: Dict[str, Any], extra: Dict[str, Any] | None = None,
+                  config_hash: Optional[str] = None) -> Dict[str, str]:
     """Compose consistent MLflow run tags with repo and dataset context.
 
     Default tags include:
@@ -76,9 +125,9 @@ def with_run_tags(cfg: Dict[str, Any], extra: Dict[str, Any] | None = None) -> D
       - config.hash
       - run.env
     """
-    commit = _git(["rev-parse", "HEAD"]) or os.getenv("GIT_COMMIT", "")
-    branch = _git(["rev-parse", "--abbrev-ref", "HEAD"]) or os.getenv("GIT_BRANCH", "")
-    conf_hash = _hash_obj(cfg)
+    commit = _git(("rev-parse", "HEAD")) or os.getenv("GIT_COMMIT", "")
+    branch = _git(("rev-parse", "--abbrev-ref", "HEAD")) or os.getenv("GIT_BRANCH", "")
+    conf_hash = config_hash or _hash_obj(cfg)
     tags: Dict[str, str] = {
         "git.commit": commit,
         "git.branch": branch,
@@ -95,3 +144,150 @@ def with_run_tags(cfg: Dict[str, Any], extra: Dict[str, Any] | None = None) -> D
         if "description" in extra:
             tags["mlflow.note.content"] = str(extra["description"])
     return tags
+
+
+class Tracker:
+    """Buffered MLflow logging for one process.
+
+    Params, metrics and tags logged inside `start_run` are kept in memory and sent
+    as `log_batch` requests when the run ends (or on `flush`). Artifacts are
+    snapshotted to a temp dir and uploaded by a single background thread so that
+    training does not wait on the tracking store. When disabled every method is
+    a no-op.
+    """
+
+    def __init__(self, cfg: Dict[str, Any], enabled: Optional[bool] = None):
+        self._cfg = cfg
+        self._config_hash: Optional[str] = None
+        self.enabled = tracking_enabled(cfg) if enabled is None else enabled
+        self.run_id: Optional[str] = None
+        self._params: Dict[str, str] = {}
+        self._metrics: List[Any] = []
+        self._tags: Dict[str, str] = {}
+        self._client = None
+        self._uploads: List[Future] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._staging = None
+
+    @property
+    def cfg(self) -> Dict[str, Any]:
+        return self._cfg
+
+    @cfg.setter
+    def cfg(self, cfg: Dict[str, Any]) -> None:
+        if cfg is not self._cfg:  # a new config object: its hash is recomputed on next use
+            self._cfg, self._config_hash = cfg, None
+
+    @property
+    def config_hash(self) -> str:
+        """Hash of `cfg`, computed once (configs are not edited in place once tracked)."""
+        if self._config_hash is None:
+            self._config_hash = _hash_obj(self._cfg)
+        return self._config_hash
+
+    def run_tags(self, extra: Dict[str, Any] | None = None) -> Dict[str, str]:
+        return with_run_tags(self._cfg, extra, self.config_hash)
+
+    @property
+    def client(self):
+        if self._client is None:
+            init_mlflow(self.cfg)
+            self._client = mlflow.tracking.MlflowClient()
+        return self._client
+
+    @contextmanager
+    def start_run(self, run_name: str, tags: Optional[Dict[str, Any]] = None) -> Iterator["Tracker"]:
+        if not self.enabled:
+            yield self
+            return
+        self.client  # initialize experiment before starting the run
+        run_tags = {k: str(v) for k, v in (tags or {}).items()}
+        with mlflow.start_run(run_name=run_name, tags=run_tags) as run:
+            self.run_id = run.info.run_id
+            try:
+                yield self
+            finally:
+                self.flush()
+                self.run_id = None
+
+    def set_tags(self, tags: Dict[str, Any]) -> None:
+        if self.enabled:
+            self._tags.update({k: str(v) for k, v in tags.items()})
+
+    def log_params(self, params: Dict[str, Any]) -> None:
+        if self.enabled:
+            self._params.update({k: str(v) for k, v in params.items()})
+
+    def log_metrics(self, metrics: Dict[str, float], step: int = 0) -> None:
+        if not self.enabled:
+            return
+        ts = int(time.time() * 1000)
+        self._metrics.extend(Metric(k, float(v), ts, step) for k, v in metrics.items())
+
+    def flush(self) -> None:
+        """Send buffered params/metrics/tags of the active run in as few requests as possible."""
+        if not self.enabled or self.run_id is None:
+            return
+        params = [Param(k, v) for k, v in self._params.items()]
+        tags = [RunTag(k, v) for k, v in self._tags.items()]
+        metrics = self._metrics
+        self._params, self._tags, self._metrics = {}, {}, []
+        while params or tags or metrics:
+            self.client.log_batch(self.run_id, metrics=metrics[:MAX_BATCH_METRICS],
+                                  params=params[:MAX_BATCH_PARAMS], tags=tags[:MAX_BATCH_TAGS])
+            metrics = metrics[MAX_BATCH_METRICS:]
+            params = params[MAX_BATCH_PARAMS:]
+            tags = tags[MAX_BATCH_TAGS:]
+
+    def log_artifact(self, path: str, artifact_path: Optional[str] = None) -> None:
+        """Queue an upload; the file is copied first so later overwrites are not picked up."""
+        if not self.enabled or self.run_id is None:
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mlflow-upload")
+                self._staging = tempfile.mkdtemp(prefix="mlflow_upload_")
+            snap_dir = tempfile.mkdtemp(dir=self._staging)
+        snapshot = os.path.join(snap_dir, os.path.basename(path))
+        shutil.copy2(path, snapshot)
+        self._uploads.append(self._executor.submit(self._upload, self.run_id, snapshot, artifact_path))
+
+    def _upload(self, run_id: str, path: str, artifact_path: Optional[str]) -> None:
+        try:
+            self.client.log_artifact(run_id, path, artifact_path=artifact_path)
+        except Exception as e:
+            logger.error("Artifact upload failed for %s: %s", path, e)
+        finally:
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+    def wait(self) -> None:
+        """Block until every queued artifact upload has finished."""
+        uploads, self._uploads = self._uploads, []
+        for fut in uploads:
+            fut.result()
+
+    def close(self) -> None:
+        self.flush()
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            shutil.rmtree(self._staging, ignore_errors=True)
+
+
+# (tracking URI, experiment) -> tracker
+_TRACKERS: Dict[Tuple[str, str], Tracker] = {}
+
+
+def get_tracker(cfg: Dict[str, Any]) -> Tracker:
+    """Return the process-wide tracker of cfg's tracking URI and experiment (closed at exit)."""
+    target = tracking_target(cfg)
+    tracker = _TRACKERS.get(target)
+    if tracker is None:
+        tracker = _TRACKERS[target] = Tracker(cfg)
+        atexit.register(tracker.close)
+    else:
+        tracker.cfg = cfg
+        tracker.enabled = tracking_enabled(cfg)
+    return tracker
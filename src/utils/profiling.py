@@ -0,0 +1,170 @@
+"""Profiling helpers
+===================
+Lightweight instrumentation for pipeline stages and sampled API requests.
+
+Classes
+-------
+- StageProfiler(entrypoint, cfg)
+  `with prof.stage("name"):` records wall time, CPU time and peak RSS of the block.
+  `prof.save()` writes `<profiling.report_dir>/<entrypoint>.json`; passing a tracker
+  (`prof.stage("lightgbm", tracker)`) also logs the record into the active MLflow run.
+- RequestProfiler(cfg)
+  cProfile for 1 in N API requests (or on an `X-Profile: 1` header outside prod);
+  each profile is dumped as `.prof` (pstats) + `.txt` summary in `api.profiling.output_dir`.
+"""
+from __future__ import annotations
+
+import cProfile
+import io
+import itertools
+import json
+import logging
+import os
+import pstats
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger("profiling")
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process (Linux /proc), falling back to ru_maxrss."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class _RssSampler(threading.Thread):
+    """Poll RSS in the background to catch the peak reached inside a block."""
+
+    def __init__(self, interval: float = 0.02):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb())
+
+    def stop(self) -> float:
+        self._stop_event.set()
+        self.join()
+        self.peak = max(self.peak, current_rss_mb())
+        return self.peak
+
+
+class StageProfiler:
+    def __init__(self, entrypoint: str, cfg: Optional[Dict[str, Any]] = None):
+        conf = (cfg or {}).get("profiling", {})
+        self.entrypoint = entrypoint
+        self.enabled = bool(conf.get("enabled", True))
+        self.report_dir = conf.get("report_dir", os.path.join("reports", "profiles"))
+        self.sample_interval = float(conf.get("rss_sample_interval", 0.02))
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    @contextmanager
+    def stage(self, name: str, tracker=None) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        sampler = _RssSampler(self.sample_interval)
+        rss_start = current_rss_mb()
+        sampler.start()
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+            peak = sampler.stop()
+            self.stages[name] = {
+                "wall_s": wall,
+                "cpu_s": cpu,
+                "peak_rss_mb": peak,
+                "rss_delta_mb": current_rss_mb() - rss_start,
+            }
+            logger.info("[profile] %s.%s wall=%.3fs cpu=%.3fs peak_rss=%.1fMB",
+                        self.entrypoint, name, wall, cpu, peak)
+            if tracker is not None:
+                tracker.log_metrics(self.metrics(name))
+
+    def metrics(self, name: str) -> Dict[str, float]:
+        """Stage record as MLflow metric names (profile.<stage>.<metric>)."""
+        return {f"profile.{name}.{k}": v for k, v in self.stages.get(name, {}).items()}
+
+    def save(self) -> Optional[str]:
+        if not self.enabled:
+            return None
+        os.makedirs(self.report_dir, exist_ok=True)
+        path = os.path.join(self.report_dir, f"{self.entrypoint}.json")
+        report = {
+            "entrypoint": self.entrypoint,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "total_wall_s": sum(s["wall_s"] for s in self.stages.values()),
+            "stages": self.stages,
+        }
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info("Saved profile report to %s", path)
+        return path
+
+
+class RequestProfiler:
+    HEADER = "x-profile"
+
+    def __init__(self, cfg: Optional[Dict[str, Any]] = None):
+        conf = (cfg or {}).get("api", {}).get("profiling", {})
+        self.sample_every = int(conf.get("sample_every", 0))  # 0 = no sampling
+        self.allow_header = bool(conf.get("allow_header", True)) and os.getenv("ENV", "dev") != "prod"
+        self.output_dir = conf.get("output_dir", os.path.join("reports", "profiles", "api"))
+        self.top_n = int(conf.get("top_n", 30))
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        # only one cProfile can be active per interpreter; concurrent samples are skipped
+        self._active = threading.Lock()
+
+    def should_profile(self, headers) -> bool:
+        if self.allow_header and headers.get(self.HEADER, "") in {"1", "true", "True"}:
+            return True
+        if self.sample_every <= 0:
+            return False
+        with self._lock:
+            n = next(self._counter)
+        return n % self.sample_every == 0
+
+    @contextmanager
+    def profile(self, endpoint: str, headers) -> Iterator[Dict[str, str]]:
+        """Profile the block if this request is sampled; yields {'file': path} when it is."""
+        info: Dict[str, str] = {}
+        if not self.should_profile(headers) or not self._active.acquire(blocking=False):
+            yield info
+            return
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+            try:
+                yield info
+            finally:
+                prof.disable()
+                info["file"] = self._dump(endpoint, prof)
+        finally:
+            self._active.release()
+
+    def _dump(self, endpoint: str, prof: cProfile.Profile) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        base = os.path.join(self.output_dir, f"{endpoint}_{stamp}")
+        prof.dump_stats(base + ".prof")
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(self.top_n)
+        with open(base + ".txt", "w") as f:
+            f.write(buf.getvalue())
+        return base + ".prof"
@@ -0,0 +1,38 @@
+"""Compute resources
+===================
+CPU budget of the current process, shared by the API server (workers x threads),
+the background job pool and LightGBM training.
+
+Functions
+---------
+- cpu_quota() -> int
+  CPUs this process may use: cgroup v2/v1 quota, then CPU affinity, then cpu_count.
+"""
+from __future__ import annotations
+
+import math
+import os
+
+
+def cpu_quota() -> int:
+    """Number of CPUs this process may use (cgroup quota, then affinity, then cpu_count)."""
+    try:  # cgroup v2
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:  # cgroup v1
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0:
+            return max(1, math.ceil(quota / period))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
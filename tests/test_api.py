@@ -56,3 +56,104 @@ def test_forecast_upload_csv():
     data = r.json()
     assert 'forecast' in data and len(data['forecast']) == 3
     assert 'metrics' in data and 'mae' in data['metrics']
+
+
+def test_forecast_rejects_non_positive_freq():
+    files = {"file": ("freq.csv", 'timestamp,value\n2025-10-28T00:00:00Z,5\n', "text/csv")}
+    for freq in ('0h', '-1h', 'abc'):
+        r = client.post(f'/forecast?freq={freq}', files=files)
+        assert r.status_code == 400, (freq, r.text)
+    r = client.post('/forecast?horizon=35040&freq=1000D', files=files)
+    assert r.status_code == 400 and '2262' in r.text
+
+
+def test_forecast_etag_and_cache():
+    csv_content = 'timestamp,value\n2025-10-28T00:00:00Z,5\n2025-10-28T01:00:00Z,7\n'
+    files = {"file": ("etag.csv", csv_content, "text/csv")}
+    r1 = client.post('/forecast', files=files)
+    assert r1.status_code == 200
+    etag = r1.headers.get('etag')
+    assert etag
+    hits_before = client.get('/cache/stats').json()['hits']
+    r2 = client.post('/forecast', files=files)
+    per_response = ('inference_ms', 'timestamp')
+    strip = lambda d: {k: v for k, v in d.items() if k not in per_response}
+    assert strip(r2.json()) == strip(r1.json())
+    assert r2.json()['timestamp'] != r1.json()['timestamp']
+    assert (r1.headers['x-cache'], r2.headers['x-cache']) == ('MISS', 'HIT')
+    assert client.get('/cache/stats').json()['hits'] == hits_before + 1
+    r3 = client.post('/forecast', files=files, headers={"If-None-Match": etag})
+    assert r3.status_code == 304
+    assert r3.content == b''
+    # "*" is not a validator for a POST body: always answered in full
+    assert client.post('/forecast', files=files, headers={"If-None-Match": "*"}).status_code == 200
+
+
+def test_etag_never_hides_an_error():
+    from api import serve_api
+    from api.cache import series_key
+
+    for model, status in (("nope", 400), ("lstm", 400)):
+        etag = f'"{series_key([1.0, 2.0], model, serve_api._model_version(model))}"'
+        r = client.post('/predict', json={"recent_history": [1, 2], "model": model},
+                        headers={"If-None-Match": etag})
+        assert r.status_code in (status, 404), (model, r.status_code)
+
+
+def test_forecast_content_negotiation():
+    csv_content = 'timestamp,value\n2025-10-27T00:00:00Z,10\n2025-10-27T01:00:00Z,12\n'
+    files = {"file": ("long.csv", csv_content, "text/csv")}
+    r_json = client.post('/forecast?horizon=96&freq=15min', files=files)
+    assert r_json.headers['content-type'] == 'application/json'
+    points = r_json.json()['forecast']
+    assert len(points) == 96 and points[0]['timestamp'] == '2025-10-27T01:15:00+00:00'
+    r_col = client.post('/forecast?horizon=96&freq=15min', files=files,
+                        headers={"Accept": "application/vnd.greenpulse.columnar+json"})
+    col = r_col.json()['forecast']
+    assert col['start'] == points[0]['timestamp'] and col['periods'] == 96
+    assert col['values'] == [p['value'] for p in points]
+    assert r_col.headers['etag'] != r_json.headers['etag']
+    assert len(r_col.content) < len(r_json.content)
+
+
+def test_forecast_msgpack_is_served_or_refused(monkeypatch):
+    from api import serialization
+    files = {"file": ("mp.csv", 'timestamp,value\n2025-10-27T00:00:00Z,10\n', "text/csv")}
+    if serialization.msgpack is not None:
+        r = client.post('/forecast', files=files, headers={"Accept": "application/x-msgpack"})
+        assert r.status_code == 200 and r.headers['content-type'] == 'application/x-msgpack'
+    monkeypatch.setattr(serialization, "msgpack", None)
+    r = client.post('/forecast', files=files, headers={"Accept": "application/x-msgpack"})
+    assert r.status_code == 406
+
+
+def test_intervals_from_calibration_table(tmp_path, monkeypatch):
+    import numpy as np
+    from api import serve_api
+    from api.model_store import ModelStore
+    from utils.intervals import persistence_residuals, save_table
+
+    y = np.tile([0.0, 1.0, 2.0, 3.0], 100)
+    save_table(str(tmp_path), {"persistence": persistence_residuals(y, 8)}, "1h")
+    monkeypatch.setattr(serve_api, "model_store", ModelStore(str(tmp_path)))
+
+    r = client.post('/predict', json={"recent_history": [1, 2, 30], "model": "persistence"})
+    band = r.json()['intervals']['0.8']
+    assert band['lower'][0] < 30 < band['upper'][0] and r.json()['is_on'] == [1]
+
+    csv_content = 'timestamp,value\n2025-10-29T00:00:00Z,0\n2025-10-29T01:00:00Z,3\n2025-10-29T02:00:00Z,0\n'
+    data = client.post('/forecast?horizon=4', files={"file": ("iv.csv", csv_content, "text/csv")}).json()
+    assert 0 <= data['confidence'] <= 1
+    assert abs(sum(k['prob'] for k in data['topK']) - 1) < 1e-3
+    assert len(data['intervals']['0.95']['upper']) == 4 and min(data['intervals']['0.95']['lower']) >= 0
+    assert data['is_on'][0] in (0, None)
+
+    # a missing last reading is no OFF state, with or without a table
+    csv_nan = 'timestamp,value\n2025-10-29T00:00:00Z,3\n2025-10-29T01:00:00Z,\n'
+    data = client.post('/forecast?horizon=2', files={"file": ("nan.csv", csv_nan, "text/csv")}).json()
+    assert data['is_on'] == [None, None] and data['p_on'] == [None, None]
+    assert data['intervals']['0.95']['upper'] == [None, None] and data['confidence'] is None
+    monkeypatch.setattr(serve_api, "model_store", ModelStore(str(tmp_path / "none")))
+    csv_nan = csv_nan.replace(',3', ',4')
+    data = client.post('/forecast?horizon=2', files={"file": ("nan.csv", csv_nan, "text/csv")}).json()
+    assert data['is_on'] == [None, None]
@@ -0,0 +1,23 @@
+from benchmarks.harness import compare, measure
+from benchmarks.synthetic import make_meter_data
+from src.data.data_load import read_and_concat
+
+
+def test_synthetic_data_matches_raw_format(tmp_path):
+	paths = make_meter_data(str(tmp_path), scale=2, base_rows=100)
+	assert len(paths) == 3
+	df = read_and_concat(str(tmp_path), date_col="TxnDate", time_col="TxnTime",
+	                     consumption_col="Consumption", dayfirst=True)
+	assert len(df) == 200
+	assert df["datetime"].is_monotonic_increasing
+
+
+def test_measure_and_compare():
+	result, stats = measure(sum, range(1000), repeat=2)
+	assert result == sum(range(1000))
+	assert stats["repeat"] == 2 and stats["wall_s_best"] >= 0
+	base = {"results": {"api": {"predict": {"p50_ms": 10.0, "throughput_rps": 100.0, "requests": 5}}}}
+	cur = {"results": {"api": {"predict": {"p50_ms": 20.0, "throughput_rps": 50.0, "requests": 5}}}}
+	rows = {r["metric"]: r for r in compare(cur, base)}
+	assert set(rows) == {"api.predict.p50_ms", "api.predict.throughput_rps"}
+	assert rows["api.predict.p50_ms"]["regression"] and rows["api.predict.throughput_rps"]["regression"]
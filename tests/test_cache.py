@@ -0,0 +1,46 @@
+import time
+
+from api.cache import ResultCache, artifact_version, series_key
+
+
+def test_series_key_depends_on_model_version():
+	k1 = series_key([1.0, 2.0], "lightgbm", "v1")
+	assert k1 == series_key([1, 2], "lightgbm", "v1")
+	assert k1 != series_key([1.0, 2.0], "lightgbm", "v2")
+	assert k1 != series_key([1.0, 2.0], "lstm", "v1")
+
+
+def test_lru_eviction_by_bytes():
+	cache = ResultCache(max_bytes=60, ttl_seconds=60)
+	cache.put("a", "m", {"v": "x" * 20})
+	cache.put("b", "m", {"v": "y" * 20})
+	assert cache.get("a") is not None  # a becomes most recent
+	cache.put("c", "m", {"v": "z" * 20})
+	assert cache.get("b") is None
+	assert cache.get("a") is not None and cache.get("c") is not None
+	assert cache.stats["evictions"] == 1
+
+
+def test_ttl_and_version_invalidation(tmp_path):
+	cache = ResultCache(ttl_seconds=0.05)
+	cache.put("k", "m", {"v": 1})
+	time.sleep(0.06)
+	assert cache.get("k") is None
+	assert cache.stats["expirations"] == 1
+
+	artifact = tmp_path / "model.txt"
+	artifact.write_text("a")
+	cache = ResultCache(ttl_seconds=60)
+	cache.observe_version("m", artifact_version(str(artifact)))
+	cache.put("k", "m", {"v": 1})
+	artifact.write_text("changed")
+	cache.observe_version("m", artifact_version(str(artifact)))
+	assert cache.get("k") is None
+
+
+def test_disk_tier(tmp_path):
+	cache = ResultCache(ttl_seconds=60, disk_dir=str(tmp_path))
+	cache.put("k", "m", {"v": 1})
+	fresh = ResultCache(ttl_seconds=60, disk_dir=str(tmp_path))
+	assert fresh.get("k") == {"v": 1}
+	assert fresh.stats["disk_hits"] == 1
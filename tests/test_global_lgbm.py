@@ -0,0 +1,74 @@
+import os
+import time
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.global_lgbm import (METER_FEATURE, ParquetSequence, feature_columns, fleet_datasets,
+                                fleet_files, meter_features, prepare_fleet, train_params, write_meter_chunks)
+from utils.matrix_cache import MatrixCache
+
+
+def _write_fleet(tmp_path, n_meters=3, periods=600):
+	out = tmp_path / "fleet"
+	out.mkdir()
+	idx = pd.date_range("2025-01-01", periods=periods, freq="15min", name="datetime")
+	for m in range(n_meters):
+		t = np.arange(periods)
+		clean = pd.DataFrame({"consumption": (m + 1) * (1.5 + np.sin(t / 16.0)), "is_on": 1}, index=idx)
+		write_meter_chunks(meter_features(clean), str(out / f"meter_{m}.parquet"), rows_per_chunk=128)
+	return str(out)
+
+
+def test_sequence_reads_across_row_groups(tmp_path):
+	meters = fleet_files(_write_fleet(tmp_path, n_meters=1))
+	path = meters["meter_0"]
+	cols = feature_columns(path, "consumption")
+	assert "is_on" not in cols and "datetime" not in cols
+	seq = ParquetSequence(path, cols, meter_code=7, start=100, stop=300)
+	expected = pd.read_parquet(path)[cols].to_numpy(np.float32)[100:300]
+	assert len(seq) == 200
+	np.testing.assert_array_equal(seq[0:200][:, :-1], expected)
+	np.testing.assert_array_equal(seq[150][:-1], expected[150])
+	assert seq[150].dtype == np.float64 and (seq[0:10][:, -1] == 7).all()
+
+
+def test_out_of_core_dataset_matches_in_memory_and_is_reused(tmp_path):
+	meters = fleet_files(_write_fleet(tmp_path))
+	cols = feature_columns(next(iter(meters.values())), "consumption")
+	params = train_params({"num_leaves": 7, "min_data_in_leaf": 5}, cpus=1)
+	cache = MatrixCache(str(tmp_path / "cache"))
+
+	dtrain, dvalid, reused = fleet_datasets(meters, cols, "consumption", params, valid_rows=96, cache=cache)
+	assert not reused and dvalid is not None
+	model = lgb.train(params, dtrain, num_boost_round=10)
+
+	frames = []
+	for code, path in enumerate(meters.values()):
+		df = pd.read_parquet(path).iloc[:-96]
+		frames.append(df[cols].assign(**{METER_FEATURE: code, "y": df["consumption"]}))
+	full = pd.concat(frames)
+	ref = lgb.train(params, lgb.Dataset(full[cols + [METER_FEATURE]].to_numpy(), label=full["y"].to_numpy(),
+	                                    feature_name=cols + [METER_FEATURE], categorical_feature=[METER_FEATURE],
+	                                    params=params), num_boost_round=10)
+	X = full[cols + [METER_FEATURE]].to_numpy()
+	np.testing.assert_allclose(model.predict(X), ref.predict(X), rtol=1e-6)
+	assert dtrain.num_data() == len(full)
+
+	dtrain2, _, reused = fleet_datasets(meters, cols, "consumption", params, valid_rows=96, cache=cache)
+	assert reused and dtrain2.num_data() == dtrain.num_data()
+
+	path = meters["meter_0"]
+	os.utime(path, (time.time() + 10, time.time() + 10))  # same content: still the same fleet
+	assert fleet_datasets(meters, cols, "consumption", params, valid_rows=96, cache=cache)[2]
+	df = pd.read_parquet(path)
+	write_meter_chunks(df.assign(consumption=df["consumption"] + 1), path, rows_per_chunk=128)
+	assert not fleet_datasets(meters, cols, "consumption", params, valid_rows=96, cache=cache)[2]
+
+
+def test_prepare_requires_fleet_dir(tmp_path):
+	cfg = {"paths": {"raw_dir": "data/raw", "fleet_raw_dir": None, "fleet_features_dir": str(tmp_path)}, "data": {}}
+	with pytest.raises(ValueError, match="fleet_raw_dir"):
+		prepare_fleet(cfg)
@@ -0,0 +1,35 @@
+import warnings
+
+import numpy as np
+
+from utils.intervals import IntervalTable, conformal_quantiles, persistence_residuals, save_table
+
+
+def test_conformal_quantiles_cover_held_out_residuals():
+	rng = np.random.default_rng(0)
+	calib, fresh = rng.normal(size=2000), rng.normal(size=20000)
+	q80, q95 = conformal_quantiles(np.abs(calib), levels=(0.8, 0.95))
+	assert 0.78 < np.mean(np.abs(fresh) <= q80) < 0.83
+	assert 0.94 < np.mean(np.abs(fresh) <= q95) < 0.97
+
+
+def test_table_lookup_bounds_and_probabilities(tmp_path):
+	rng = np.random.default_rng(1)
+	y = np.cumsum(rng.normal(size=3000)) + 50
+	with warnings.catch_warnings():
+		warnings.simplefilter("error")  # legacy "15T" is normalised without a pandas FutureWarning
+		path = save_table(str(tmp_path), {"persistence": persistence_residuals(y, 48)}, "15T")
+	table = IntervalTable.load(path)
+	assert table.freq == "15min" and table.has("naive-persistence")
+
+	pred = np.full(8, 10.0)
+	band = table.bounds("naive-persistence", pred, levels=(0.8, 0.95), freq="1h")["0.8"]
+	width = np.subtract(band["upper"], band["lower"])
+	assert (np.diff(width) >= 0).all()  # hourly steps map to columns 4, 8, ... of the 15 min table
+	np.testing.assert_allclose(width[0] / 2, table.q["persistence"][3, 3])
+	assert table.steps("persistence", 3, "5min").tolist() == [0, 0, 0]
+
+	q80 = table.q["persistence"][3, 0]
+	np.testing.assert_allclose(table.abs_error_cdf("persistence", [q80]), [0.8])
+	p = [table.prob_above("persistence", [pred], threshold=10.0)[0] for pred in (10.0, 10.0 - q80, 10.0 + q80)]
+	np.testing.assert_allclose(p, [0.5, 0.1, 0.9])
@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+
+from utils.matrix_cache import MatrixCache
+
+
+def test_arrays_round_trip_memory_mapped(tmp_path):
+	cache = MatrixCache(str(tmp_path / "cache"))
+	key = cache.key("split", "abc", 30)
+	assert cache.get_arrays(key) is None
+	x = np.arange(12, dtype=np.float64).reshape(3, 4)
+	cache.put_arrays(key, {"X": x}, {"columns": list("abcd")})
+	arrays, meta = MatrixCache(cache.root).get_arrays(key)
+	assert isinstance(arrays["X"], np.memmap) and not arrays["X"].flags.writeable
+	np.testing.assert_array_equal(arrays["X"], x)
+	assert meta == {"columns": list("abcd")}
+	assert cache.key("split", "abc", 31) != key
+
+
+def test_fingerprint_follows_content(tmp_path):
+	cache = MatrixCache(str(tmp_path / "cache"))
+	path = tmp_path / "features.csv"
+	path.write_text("a,b\n1,2\n")
+	first = cache.fingerprint(str(path))
+	assert cache.fingerprint(str(path)) == first
+	path.write_text("a,b\n1,3\n")
+	assert cache.fingerprint(str(path)) != first
+
+
+def test_lru_eviction_by_size(tmp_path):
+	block = np.zeros(1000, dtype=np.float64)  # ~8 KB per entry
+	cache = MatrixCache(str(tmp_path / "cache"), max_bytes=20_000)
+	for i in range(2):
+		cache.put_arrays(f"k{i}", {"x": block})
+	os.utime(os.path.join(cache.root, "k0", "meta.json"), (1, 1))
+	os.utime(os.path.join(cache.root, "k1", "meta.json"), (2, 2))
+	assert cache.get_arrays("k0") is not None  # k0 becomes most recently used
+	cache.put_arrays("k2", {"x": block})
+	assert set(cache.entries()) == {"k0", "k2"}
+	assert cache.stats["evictions"] == 1 and cache.size() <= 20_000
+
+
+def test_load_split_same_frames_from_cache(tmp_path):
+	import pandas as pd
+
+	from models.train_model import load_split
+
+	idx = pd.date_range("2025-01-01", periods=96 * 3, freq="15min", name="datetime")
+	df = pd.DataFrame({"lag_1": np.arange(len(idx), dtype=float), "consumption": np.sin(np.arange(len(idx)))}, index=idx)
+	path = tmp_path / "features.csv"
+	df.to_csv(path)
+	cache = MatrixCache(str(tmp_path / "cache"))
+	key = cache.key("split", cache.fingerprint(str(path)), "consumption", 1, "15min")
+	first = load_split(cache, key, str(path), "consumption", 1, "15min")
+	second = load_split(cache, key, str(path), "consumption", 1, "15min")
+	assert cache.stats["hits"] == 1
+	for a, b in zip(first, second):
+		pd.testing.assert_index_equal(a.index, b.index)
+		np.testing.assert_array_equal(np.asarray(a), np.asarray(b))
+	assert len(second[2]) == 96 and list(second[0].columns) == ["lag_1"]
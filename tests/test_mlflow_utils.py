@@ -0,0 +1,77 @@
+import mlflow
+
+from utils import mlflow_utils
+from utils.mlflow_utils import Tracker, get_tracker, with_run_tags
+
+
+def test_run_tags_reuse_cached_context(monkeypatch):
+	calls = []
+	mlflow_utils._git.cache_clear()
+	real = mlflow_utils.subprocess.check_output
+	monkeypatch.setattr(mlflow_utils.subprocess, "check_output",
+	                    lambda *a, **k: calls.append(a) or real(*a, **k))
+	cfg = {"training": {"target_col": "consumption"}}
+	t1 = with_run_tags(cfg, {"model": "x"})
+	t2 = with_run_tags(cfg, {"model": "y"})
+	assert len(calls) == 2  # commit + branch, computed once
+	assert t1["config.hash"] == t2["config.hash"]
+	assert t2["model"] == "y"
+	cfg["training"]["target_col"] = "power"
+	assert with_run_tags(cfg)["config.hash"] != t1["config.hash"]
+
+
+def test_tracker_hashes_config_once_per_config(monkeypatch):
+	hashes = []
+	real = mlflow_utils._hash_obj
+	monkeypatch.setattr(mlflow_utils, "_hash_obj", lambda obj: hashes.append(obj) or real(obj))
+	cfg = {"training": {"target_col": "consumption"}}
+	tracker = Tracker(cfg, enabled=False)
+	t1, t2 = tracker.run_tags({"model": "x"}), tracker.run_tags({"model": "y"})
+	assert len(hashes) == 1 and t1["config.hash"] == t2["config.hash"] == with_run_tags(cfg)["config.hash"]
+	tracker.cfg = {"training": {"target_col": "power"}}
+	assert tracker.run_tags()["config.hash"] != t1["config.hash"]
+
+
+def test_get_tracker_per_tracking_target(monkeypatch):
+	monkeypatch.setattr(mlflow_utils, "_TRACKERS", {})
+	monkeypatch.setattr(mlflow_utils.atexit, "register", lambda fn: fn)
+	a = {"mlflow": {"tracking_uri": "file:/tmp/a", "experiment_name": "e"}}
+	b = {"mlflow": {"tracking_uri": "file:/tmp/b", "experiment_name": "e"}}
+	assert get_tracker(a) is get_tracker(dict(a)) and get_tracker(a) is not get_tracker(b)
+	assert get_tracker(b).cfg is b
+
+
+def test_disabled_tracker_is_noop(monkeypatch):
+	monkeypatch.setenv("MLFLOW_DISABLE", "1")
+	tracker = Tracker({"mlflow": {"tracking_uri": "file:/nonexistent"}})
+	with tracker.start_run("noop", tags={"a": 1}):
+		tracker.log_params({"p": 1})
+		tracker.log_metrics({"m": 1.0})
+		tracker.log_artifact("does-not-exist.txt")
+	tracker.close()
+	assert tracker.run_id is None
+
+
+def test_tracker_batches_and_uploads(tmp_path, monkeypatch):
+	monkeypatch.setenv("MLFLOW_ALLOW_FILE_STORE", "true")
+	cfg = {"mlflow": {"tracking_uri": f"file:{tmp_path / 'mlruns'}", "experiment_name": "t"}}
+	tracker = Tracker(cfg, enabled=True)
+	artifact = tmp_path / "model.txt"
+	artifact.write_text("weights")
+	batches = []
+	real_log_batch = tracker.client.log_batch
+	monkeypatch.setattr(tracker.client, "log_batch",
+	                    lambda run_id, **kw: batches.append(kw) or real_log_batch(run_id, **kw))
+	with tracker.start_run("batched", tags={"model": "x"}):
+		run_id = tracker.run_id
+		tracker.log_params({"a": 1, "b": [1, 2]})
+		tracker.log_metrics({"rmse": 1.5, "mae": 0.5})
+		tracker.log_artifact(str(artifact), artifact_path="models")
+	tracker.close()
+	assert len(batches) == 1
+	run = mlflow.tracking.MlflowClient().get_run(run_id)
+	assert run.data.params == {"a": "1", "b": "[1, 2]"}
+	assert run.data.metrics == {"rmse": 1.5, "mae": 0.5}
+	assert run.data.tags["model"] == "x"
+	files = [f.path for f in mlflow.tracking.MlflowClient().list_artifacts(run_id, "models")]
+	assert files == ["models/model.txt"]
@@ -0,0 +1,44 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from api import serve_api
+from utils.profiling import RequestProfiler, StageProfiler
+
+
+class _Recorder:
+	def __init__(self):
+		self.metrics = {}
+
+	def log_metrics(self, m):
+		self.metrics.update(m)
+
+
+def test_stage_profiler_report(tmp_path):
+	prof = StageProfiler("unit", {"profiling": {"report_dir": str(tmp_path)}})
+	tracker = _Recorder()
+	with prof.stage("work", tracker):
+		sum(range(100000))
+	path = prof.save()
+	with open(path) as f:
+		report = json.load(f)
+	assert set(report["stages"]["work"]) == {"wall_s", "cpu_s", "peak_rss_mb", "rss_delta_mb"}
+	assert report["stages"]["work"]["peak_rss_mb"] > 0
+	assert "profile.work.wall_s" in tracker.metrics
+
+
+def test_request_sampling():
+	prof = RequestProfiler({"api": {"profiling": {"sample_every": 3, "allow_header": False}}})
+	sampled = [prof.should_profile({"x-profile": "1"}) for _ in range(6)]
+	assert sampled == [False, False, True, False, False, True]
+
+
+def test_profile_header_writes_cprofile(tmp_path, monkeypatch):
+	monkeypatch.setattr(serve_api.request_profiler, "output_dir", str(tmp_path))
+	client = TestClient(serve_api.app)
+	r = client.post('/predict', json={"recent_history": [1, 2, 3], "model": "persistence"},
+	                headers={"X-Profile": "1"})
+	assert r.status_code == 200
+	name = r.headers["x-profile-file"]
+	assert (tmp_path / name).exists()
+	assert (tmp_path / name.replace(".prof", ".txt")).exists()
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from api.serialization import (COLUMNAR, JSON, MSGPACK, available_formats,
+                               columnar_series, expand_series, negotiate)
+
+
+def test_negotiate_honours_quality_and_falls_back_to_json(monkeypatch):
+	assert negotiate(None) == JSON
+	assert negotiate("*/*") == JSON
+	assert negotiate("text/html") == JSON
+	assert negotiate(f"application/json;q=0.5, {COLUMNAR}") == COLUMNAR
+	assert negotiate(f"{COLUMNAR};q=0.1, application/json") == JSON
+
+	from api import serialization
+	if serialization.msgpack is not None:
+		assert negotiate("application/x-msgpack") == MSGPACK
+	monkeypatch.setattr(serialization, "msgpack", None)
+	assert MSGPACK not in available_formats()
+	assert negotiate("application/x-msgpack") is None  # 406, not a JSON body the client cannot read
+	assert negotiate("application/x-msgpack, application/json;q=0.5") == JSON
+
+
+def test_expand_series_matches_isoformat():
+	start = pd.Timestamp("2025-10-27T01:00:00Z")
+	col = columnar_series(start, "1h", [1.0, 2.0, 3.0])
+	points = expand_series(col)
+	idx = pd.date_range(start, periods=3, freq="1h")
+	assert [p["timestamp"] for p in points] == [ts.isoformat() for ts in idx]
+	assert [p["value"] for p in points] == [1.0, 2.0, 3.0]
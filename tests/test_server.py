@@ -0,0 +1,45 @@
+import os
+import time
+
+from api import model_store
+from api.model_store import ModelStore
+from api.server import plan_resources
+from utils.resources import cpu_quota
+
+
+def test_plan_resources_fits_cpu_quota():
+	assert plan_resources("auto", "auto", cpus=8) == (8, 1)
+	assert plan_resources(2, "auto", cpus=8) == (2, 4)
+	assert plan_resources(16, "auto", cpus=8) == (16, 1)
+	assert plan_resources("auto", "auto")[0] == cpu_quota() >= 1
+	assert plan_resources("3", "2", cpus=8) == (3, 2)
+
+
+def test_model_store_loads_once_and_reloads_on_change(tmp_path, monkeypatch):
+	calls = []
+	monkeypatch.setitem(model_store.LOADERS, "sarimax",
+	                    lambda path, threads: calls.append(path) or open(path).read())
+	store = ModelStore(str(tmp_path), threads=1)
+	assert store.get("sarimax") is None
+	artifact = tmp_path / "sarimax.pkl"
+	artifact.write_text("v1")
+	assert store.get("sarimax") == "v1"
+	assert store.get("sarimax") == "v1"
+	assert len(calls) == 1
+	artifact.write_text("v2-longer")
+	os.utime(artifact, (time.time() + 5, time.time() + 5))
+	assert store.get("sarimax") == "v2-longer"
+	assert store.preload(["sarimax"]) == ["sarimax"]
+	assert len(calls) == 2
+
+
+def test_interval_table_has_its_own_accessor(tmp_path):
+	import numpy as np
+	from utils.intervals import persistence_residuals, save_table
+
+	store = ModelStore(str(tmp_path), threads=1)
+	assert "intervals" not in model_store.MODEL_FILES and store.intervals() is None
+	save_table(str(tmp_path), {"persistence": persistence_residuals(np.arange(200.0), 4)}, "1h")
+	table = store.intervals()
+	assert table.has("persistence") and store.intervals() is table
+	assert store.loaded() == {}  # not listed among the models